@@ -0,0 +1,10 @@
+"""Тесты pytest работают с кешем, метриками и журналом медленных
+запросов во временном каталоге (core.scratch), как и manage.py test."""
+import pytest
+
+
+@pytest.fixture(autouse=True, scope='session')
+def scratch_files(django_test_environment):
+    from core import scratch
+    with scratch.isolated():
+        yield
@@ -0,0 +1,197 @@
+"""Замер всех именованных страниц сайта через тестовый клиент Django.
+
+Каждый URL из posts.urls, users.urls и about.urls запрашивается
+несколько раз подряд; отчёт содержит перцентили времени ответа,
+число SQL-запросов и пиковую память Python на один запрос. Отчёты
+разных коммитов сравнивает compare().
+"""
+import math
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from importlib import import_module
+
+import django
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from posts.models import Comment, Follow, Group, Post, User
+
+URL_MODULES = ('posts.urls', 'posts.api_urls', 'users.urls', 'about.urls')
+# Параметры запроса для страниц, которым без них нечего показывать.
+QUERY_PARAMS = {
+    'posts:post_search': lambda sample: {'q': sample['word']},
+}
+
+
+def url_names():
+    """Имена всех URL вида `namespace:name` в порядке объявления."""
+    for module_name in URL_MODULES:
+        module = import_module(module_name)
+        for pattern in module.urlpatterns:
+            if isinstance(pattern, URLPattern) and pattern.name:
+                yield f'{module.app_name}:{pattern.name}', pattern
+
+
+def pick_sample():
+    """Объекты, на которых меряются страницы: самый читающий
+    пользователь, самый популярный автор, самые большие группа и
+    обсуждение."""
+    reader = User.objects.filter(
+        pk=Follow.objects.values('user').annotate(
+            total=Count('pk')
+        ).order_by('-total').values('user')[:1]
+    ).first() or User.objects.order_by('pk').first()
+    author = User.objects.annotate(
+        total=Count('posts')
+    ).order_by('-total').first()
+    group = Group.objects.annotate(
+        total=Count('posts')
+    ).order_by('-total').first()
+    post = Post.objects.order_by('-comment_count', '-pk').first()
+    if reader is None:
+        raise ValueError('В базе нет пользователей для замеров.')
+    words = post.text.split() if post else []
+    return {
+        'reader': reader,
+        'word': max(words, key=len).strip('.,!?') if words else 'a',
+        'kwargs': {
+            'username': author.username if author else '',
+            'slug': group.slug if group else '',
+            'post_id': post.pk if post else 0,
+            'uidb64': urlsafe_base64_encode(force_bytes(reader.pk)),
+            'token': default_token_generator.make_token(reader),
+        },
+    }
+
+
+def percentile(values, percent):
+    """Перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _request(client, url, params):
+    response = client.get(url, params)
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def measure(client, url, params, iterations, cold, login):
+    timings = []
+    for _ in range(iterations + 1):
+        login()
+        if cold:
+            cache.clear()
+        started = time.perf_counter()
+        response = _request(client, url, params)
+        timings.append((time.perf_counter() - started) * 1000)
+    # Первый запрос - прогрев.
+    timings = timings[1:]
+    # Запросы и память - отдельным проходом, чтобы их учёт
+    # не искажал время.
+    login()
+    if cold:
+        cache.clear()
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            _request(client, url, params)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'url': url,
+        'status': response.status_code,
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'queries': len(queries),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(iterations=20, cold=True, names=None, as_staff=False):
+    """Меряет страницы; names ограничивает набор URL, as_staff даёт
+    пользователю замеров права модератора (только во временной БД)."""
+    sample = pick_sample()
+    if as_staff:
+        sample['reader'].is_staff = True
+        sample['reader'].save(update_fields=['is_staff'])
+    client = Client()
+
+    def login():
+        # Страница выхода разлогинивает клиента.
+        if '_auth_user_id' not in client.session:
+            client.force_login(sample['reader'])
+
+    results = {}
+    for name, pattern in url_names():
+        if names and name not in names:
+            continue
+        kwargs = {
+            key: sample['kwargs'][key]
+            for key in pattern.pattern.converters
+        }
+        params = QUERY_PARAMS.get(name, lambda sample: {})(sample)
+        results[name] = measure(
+            client, reverse(name, kwargs=kwargs), params,
+            iterations, cold, login,
+        )
+    return {
+        'meta': {
+            'commit': _commit(),
+            'date': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'iterations': iterations,
+            'cache': 'cold' if cold else 'warm',
+            'posts': Post.objects.count(),
+            'comments': Comment.objects.count(),
+            'users': User.objects.count(),
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, current):
+    """Строки сравнения двух отчётов: имя, p95 и запросы было/стало."""
+    lines = []
+    for name, now in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            lines.append(f'{name}: новый URL, p95 {now["p95_ms"]} мс')
+            continue
+        change = (
+            (now['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100
+            if before['p95_ms'] else 0
+        )
+        lines.append(
+            f'{name}: p95 {before["p95_ms"]} -> {now["p95_ms"]} мс '
+            f'({change:+.1f}%), запросов {before["queries"]} -> '
+            f'{now["queries"]}'
+        )
+    return lines
@@ -0,0 +1,169 @@
+"""Сравнение бэкендов кеша: LocMemCache, FileBasedCache и SQLiteCache.
+
+Замеров два. Операции: время set, get, set_many и get_many на
+значениях размера страницы ленты в одном процессе. Воркеры: несколько
+процессов читают ключи с распределением Ципфа и на промахе кладут
+значение, как это делает cache_feed; доля попаданий показывает, что
+даёт кеш, общий для всех процессов (FileBasedCache и SQLiteCache),
+против своей копии в каждом (LocMemCache).
+
+Ёмкость у всех бэкендов одна, `capacity` значений: LocMemCache и
+FileBasedCache получают MAX_ENTRIES, SQLiteCache - MAX_SIZE в байтах
+на столько же значений, так что разница в попаданиях идёт от
+общего хранилища, а не от размера кеша.
+"""
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from itertools import accumulate
+
+from django.utils.module_loading import import_string
+
+from .benchmark import percentile
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'sqlite': 'core.sqlite_cache.SQLiteCache',
+}
+# Запас на заголовок pickle сверх размера значения.
+PICKLE_OVERHEAD = 64
+
+
+def make_cache(name, directory, options=None):
+    """Отдельный экземпляр бэкенда с данными в directory."""
+    location = os.path.join(directory, name)
+    return import_string(BACKENDS[name])(
+        location, {'OPTIONS': options or {}}
+    )
+
+
+def capacity_options(name, capacity, value_size):
+    """OPTIONS бэкенда, вмещающие capacity значений value_size байт."""
+    if name == 'sqlite':
+        return {'MAX_SIZE': capacity * (value_size + PICKLE_OVERHEAD)}
+    return {'MAX_ENTRIES': capacity}
+
+
+def _summary(timings):
+    return {
+        'p50_us': round(percentile(timings, 50) * 10 ** 6, 1),
+        'p99_us': round(percentile(timings, 99) * 10 ** 6, 1),
+        'ops_per_s': round(len(timings) / sum(timings)),
+    }
+
+
+def _timed(timings, call, *args):
+    started = time.perf_counter()
+    result = call(*args)
+    timings.append(time.perf_counter() - started)
+    return result
+
+
+def operations(cache, iterations, value_size, batch):
+    """Перцентили и пропускная способность каждой операции;
+    для get - ещё доля попаданий."""
+    value = os.urandom(value_size)
+    keys = [f'bench:{number}' for number in range(iterations)]
+    batches = [
+        keys[start:start + batch] for start in range(0, iterations, batch)
+    ]
+    timings = {'set': [], 'get': [], 'set_many': [], 'get_many': []}
+    for key in keys:
+        _timed(timings['set'], cache.set, key, value)
+    hits = sum(
+        _timed(timings['get'], cache.get, key) is not None for key in keys
+    )
+    for keys_batch in batches:
+        _timed(
+            timings['set_many'], cache.set_many,
+            dict.fromkeys(keys_batch, value),
+        )
+    for keys_batch in batches:
+        _timed(timings['get_many'], cache.get_many, keys_batch)
+    cache.clear()
+    results = {name: _summary(values) for name, values in timings.items()}
+    results['get']['hit_rate'] = round(hits / iterations, 3)
+    return results
+
+
+def _worker(args):
+    name, directory, options, requests, keys, value_size, seed = args
+    cache = make_cache(name, directory, options)
+    generator = random.Random(seed)
+    value = os.urandom(value_size)
+    # Закон Ципфа: k-й по популярности ключ читают в k раз реже
+    # первого.
+    weights = list(accumulate(1 / rank for rank in range(1, keys + 1)))
+    hits = 0
+    for number in generator.choices(range(keys), cum_weights=weights,
+                                    k=requests):
+        key = f'page:{number}'
+        if cache.get(key) is None:
+            cache.set(key, value)
+        else:
+            hits += 1
+    return hits
+
+
+def workers(name, directory, options, processes, requests, keys,
+            value_size, seed):
+    """Доля попаданий и запросы в секунду у processes процессов."""
+    context = multiprocessing.get_context('fork')
+    started = time.perf_counter()
+    with context.Pool(processes) as pool:
+        hits = pool.map(_worker, [
+            (name, directory, options, requests, keys, value_size,
+             seed + number)
+            for number in range(processes)
+        ])
+    elapsed = time.perf_counter() - started
+    total = processes * requests
+    return {
+        'hit_rate': round(sum(hits) / total, 3),
+        'requests_per_s': round(total / elapsed),
+    }
+
+
+def run(iterations=2000, batch=20, value_size=20 * 1024, processes=4,
+        requests=2000, keys=1000, seed=0, capacity=None, options=None,
+        names=None):
+    """Меряет бэкенды; capacity - ёмкость в значениях (по умолчанию
+    вмещает все ключи обоих замеров), options - {бэкенд: OPTIONS}
+    поверх неё, names ограничивает набор бэкендов."""
+    capacity = capacity or max(iterations, keys)
+    options = options or {}
+    results = {}
+    for name in BACKENDS:
+        if names and name not in names:
+            continue
+        backend_options = {
+            **capacity_options(name, capacity, value_size),
+            **options.get(name, {}),
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            cache = make_cache(name, directory, backend_options)
+            results[name] = {
+                'operations': operations(
+                    cache, iterations, value_size, batch
+                ),
+                'workers': workers(
+                    name, directory, backend_options, processes,
+                    requests, keys, value_size, seed,
+                ),
+            }
+    return {
+        'meta': {
+            'iterations': iterations,
+            'batch': batch,
+            'value_size': value_size,
+            'processes': processes,
+            'requests': requests,
+            'keys': keys,
+            'seed': seed,
+            'capacity': capacity,
+        },
+        'results': results,
+    }
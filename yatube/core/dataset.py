@@ -0,0 +1,122 @@
+"""Воспроизводимый синтетический набор данных для бенчмарков.
+
+Записи генерируются потоком в формате posts.importer и загружаются
+им же, так что набор любого размера не держится в памяти целиком.
+Авторы, подписки и комментарии распределены по степенному закону
+(Zipf): немногие популярные авторы пишут больше других и собирают
+большинство подписчиков, а у немногих постов большинство комментариев.
+Одни и те же scale и seed всегда дают одинаковые данные.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+
+from faker import Faker
+
+from posts import importer
+
+SCALES = {
+    'tiny': {
+        'users': 20, 'groups': 3, 'posts': 200,
+        'comments': 400, 'follows': 60,
+    },
+    'small': {
+        'users': 200, 'groups': 10, 'posts': 5_000,
+        'comments': 10_000, 'follows': 2_000,
+    },
+    'medium': {
+        'users': 2_000, 'groups': 50, 'posts': 100_000,
+        'comments': 200_000, 'follows': 40_000,
+    },
+    'large': {
+        'users': 20_000, 'groups': 200, 'posts': 1_000_000,
+        'comments': 2_000_000, 'follows': 400_000,
+    },
+}
+# Показатель степенного закона; чем больше, тем круче "хвост".
+ZIPF_EXPONENT = 1.1
+START_DATE = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+
+def username(number):
+    return f'user{number:06d}'
+
+
+def group_slug(number):
+    return f'group-{number:04d}'
+
+
+def _zipf_weights(count):
+    """Накопленные веса Zipf для random.choices: ранг 1 - самый частый."""
+    return list(accumulate(
+        1 / rank ** ZIPF_EXPONENT for rank in range(1, count + 1)
+    ))
+
+
+def records(counts, seed=0):
+    """Поток записей для posts.importer."""
+    rng = random.Random(seed)
+    fake = Faker('ru_RU')
+    fake.seed_instance(seed)
+    users = counts['users']
+    for number in range(users):
+        yield {
+            'type': 'user',
+            'username': username(number),
+            'first_name': fake.first_name(),
+            'last_name': fake.last_name(),
+        }
+    for number in range(counts['groups']):
+        yield {
+            'type': 'group',
+            'slug': group_slug(number),
+            'title': fake.catch_phrase()[:200],
+            'description': fake.paragraph(),
+        }
+    user_weights = _zipf_weights(users)
+    population = range(users)
+    posts = counts['posts']
+    # Посты идут раз в несколько минут, от START_DATE вперёд.
+    for number in range(posts):
+        author = rng.choices(population, cum_weights=user_weights)[0]
+        group = None
+        if counts['groups'] and rng.random() < 0.7:
+            group = group_slug(rng.randrange(counts['groups']))
+        yield {
+            'type': 'post',
+            'id': number,
+            'author': username(author),
+            'group': group,
+            'text': fake.paragraph(nb_sentences=rng.randint(1, 8)),
+            'pub_date': (
+                START_DATE + timedelta(minutes=7 * number)
+            ).isoformat(),
+        }
+    post_weights = _zipf_weights(posts)
+    for number in range(counts['comments']):
+        # Чаще всего комментируют самые свежие посты.
+        post = posts - 1 - rng.choices(
+            range(posts), cum_weights=post_weights
+        )[0]
+        yield {
+            'type': 'comment',
+            'post': post,
+            'author': username(rng.randrange(users)),
+            'text': fake.sentence(),
+            'created': (
+                START_DATE + timedelta(minutes=7 * post + number % 600)
+            ).isoformat(),
+        }
+    for _ in range(counts['follows']):
+        yield {
+            'type': 'follow',
+            'user': username(rng.randrange(users)),
+            'author': username(
+                rng.choices(population, cum_weights=user_weights)[0]
+            ),
+        }
+
+
+def generate(counts, seed=0, batch_size=5000):
+    """Загружает набор в текущую БД; возвращает статистику импорта."""
+    return importer.run(records(counts, seed), batch_size=batch_size)
@@ -0,0 +1,303 @@
+"""Нагрузочный тест по HTTP с параллельными клиентами.
+
+Синтетические пользователи входят через обычную форму логина, после
+чего пул потоков с сессиями `requests` воспроизводит заданную смесь
+запросов к запущенному серверу. Результат - пропускная способность,
+перцентили задержки и доля ошибок в целом, по действиям и по
+интервалам времени.
+
+Локальный сервер работает на копии БД во временном каталоге
+(core.scratch): синтетические пользователи, их посты и комментарии
+пропадают вместе с ней, а кеш и метрики живого сервера нагрузка не
+трогает. Для чужого сервера (`--base-url`) ничего не создаётся:
+пользователей на нём заранее заводит `loadtest --prepare-only`,
+запущенный с настройками этого сервера, а адреса берутся из
+локальной БД, поэтому она должна быть той же или её копией.
+"""
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urljoin
+
+import requests
+from django.conf import settings
+from django.db.models import Count
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post, User
+
+from .benchmark import percentile
+
+DEFAULT_MIX = {
+    'index': 40,
+    'group': 10,
+    'profile': 15,
+    'post_detail': 20,
+    'follow_index': 10,
+    'add_comment': 3,
+    'post_create': 2,
+}
+USERNAME_PREFIX = 'load-user-'
+PASSWORD = 'load-test-password'
+CSRF_INPUT = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+# Сколько объектов каждого вида брать в пул адресов.
+TARGETS_LIMIT = 1000
+SERVER_START_TIMEOUT = 30
+
+
+def parse_mix(value):
+    """`index=40,post_detail=20` -> словарь весов действий."""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in DEFAULT_MIX or not weight.strip().isdigit():
+            raise ValueError(f'Неверный элемент смеси: {part!r}')
+        mix[name] = int(weight)
+    return mix
+
+
+@contextmanager
+def serve(port=8765, env=None):
+    """Запускает `runserver` с приложением settings.WSGI_APPLICATION
+    (yatube.wsgi) в отдельном процессе, чтобы сервер не делил GIL
+    с клиентами; env - окружение процесса (core.scratch.environment).
+    Отдаёт базовый URL."""
+    base_url = f'http://127.0.0.1:{port}/'
+    process = subprocess.Popen(
+        [sys.executable, 'manage.py', 'runserver', f'127.0.0.1:{port}',
+         '--noreload'],
+        cwd=settings.BASE_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
+        while True:
+            try:
+                requests.get(base_url, timeout=1)
+                break
+            except requests.ConnectionError:
+                if process.poll() is not None or (
+                    time.monotonic() > deadline
+                ):
+                    raise RuntimeError('Сервер не запустился.')
+                time.sleep(0.2)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def usernames(count):
+    """Имена синтетических пользователей, которых создаёт
+    prepare_users."""
+    return [f'{USERNAME_PREFIX}{number:04d}' for number in range(count)]
+
+
+def prepare_users(count, follows=5):
+    """Создаёт синтетических пользователей с известным паролем и
+    подписывает их на самых активных авторов."""
+    authors = list(
+        User.objects.exclude(username__startswith=USERNAME_PREFIX)
+        .annotate(total=Count('posts')).order_by('-total')
+        .values_list('pk', flat=True)[:follows]
+    )
+    names = usernames(count)
+    for username in names:
+        user, created = User.objects.get_or_create(username=username)
+        if created:
+            user.set_password(PASSWORD)
+            user.save()
+        for author_id in authors:
+            Follow.objects.get_or_create(user=user, author_id=author_id)
+    return names
+
+
+def collect_targets():
+    """Адреса для GET-запросов смеси."""
+    def sample(queryset):
+        return list(queryset[:TARGETS_LIMIT])
+    return {
+        'group': [
+            reverse('posts:group_list', kwargs={'slug': slug})
+            for slug in sample(Group.objects.values_list('slug', flat=True))
+        ],
+        'profile': [
+            reverse('posts:profile', kwargs={'username': username})
+            for username in sample(
+                User.objects.filter(posts__isnull=False).distinct()
+                .values_list('username', flat=True)
+            )
+        ],
+        'post': sample(
+            Post.objects.order_by('-pub_date').values_list('pk', flat=True)
+        ),
+        'group_ids': sample(Group.objects.values_list('pk', flat=True)),
+    }
+
+
+class Client:
+    """Сессия одного синтетического пользователя."""
+
+    def __init__(self, base_url, username, targets, rng, timeout):
+        self.base_url = base_url
+        self.session = requests.Session()
+        self.username = username
+        self.targets = targets
+        self.rng = rng
+        self.timeout = timeout
+
+    def url(self, path):
+        return urljoin(self.base_url, path)
+
+    def csrf_token(self, path):
+        page = self.session.get(self.url(path), timeout=self.timeout)
+        match = CSRF_INPUT.search(page.text)
+        return match.group(1) if match else self.session.cookies.get(
+            'csrftoken', ''
+        )
+
+    def post(self, path, data, form_path=None):
+        data['csrfmiddlewaretoken'] = self.csrf_token(form_path or path)
+        return self.session.post(
+            self.url(path), data=data, allow_redirects=False,
+            timeout=self.timeout,
+        )
+
+    def login(self):
+        response = self.post(
+            reverse('users:login'),
+            {'username': self.username, 'password': PASSWORD},
+        )
+        if response.status_code != 302:
+            raise RuntimeError(f'Не удалось войти как {self.username}')
+
+    def get(self, path):
+        return self.session.get(
+            self.url(path), allow_redirects=False, timeout=self.timeout
+        )
+
+    def act(self, action):
+        rng, targets = self.rng, self.targets
+        if action == 'index':
+            return self.get(reverse('posts:index'))
+        if action == 'follow_index':
+            return self.get(reverse('posts:follow_index'))
+        if action in ('group', 'profile') and targets[action]:
+            return self.get(rng.choice(targets[action]))
+        if action == 'post_detail' and targets['post']:
+            return self.get(reverse(
+                'posts:post_detail',
+                kwargs={'post_id': rng.choice(targets['post'])},
+            ))
+        if action == 'add_comment' and targets['post']:
+            post_id = rng.choice(targets['post'])
+            return self.post(
+                reverse('posts:add_comment', kwargs={'post_id': post_id}),
+                {'text': f'Комментарий нагрузочного теста {rng.random()}'},
+                form_path=reverse(
+                    'posts:post_detail', kwargs={'post_id': post_id}
+                ),
+            )
+        if action == 'post_create':
+            data = {'text': f'Пост нагрузочного теста {rng.random()}'}
+            if targets['group_ids']:
+                data['group'] = rng.choice(targets['group_ids'])
+            return self.post(reverse('posts:post_create'), data)
+        return self.get(reverse('posts:index'))
+
+
+def _worker(client, mix, deadline, record):
+    actions, weights = zip(*mix.items())
+    while time.monotonic() < deadline:
+        action = client.rng.choices(actions, weights)[0]
+        started = time.monotonic()
+        try:
+            status = client.act(action).status_code
+        except requests.RequestException:
+            status = None
+        finished = time.monotonic()
+        record(action, started, finished, status)
+
+
+def run(base_url, usernames, concurrency=8, duration=30, mix=None,
+        seed=0, timeout=30):
+    """Гоняет смесь запросов `duration` секунд; возвращает список
+    (действие, начало, конец, статус или None при сетевой ошибке)."""
+    mix = mix or DEFAULT_MIX
+    targets = collect_targets()
+    clients = [
+        Client(
+            base_url, usernames[number % len(usernames)], targets,
+            random.Random(seed + number), timeout,
+        )
+        for number in range(concurrency)
+    ]
+    for client in clients:
+        client.login()
+    samples = []
+    lock = threading.Lock()
+
+    def record(*sample):
+        with lock:
+            samples.append(sample)
+
+    started = time.monotonic()
+    deadline = started + duration
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [
+            pool.submit(_worker, client, mix, deadline, record)
+            for client in clients
+        ]:
+            future.result()
+    return started, samples
+
+
+def _is_error(status):
+    return status is None or status >= 400
+
+
+def _summary(samples, seconds):
+    latencies = [(end - start) * 1000 for _, start, end, _ in samples]
+    errors = sum(1 for *_, status in samples if _is_error(status))
+    if not samples:
+        return {'requests': 0, 'rps': 0, 'error_rate': 0}
+    return {
+        'requests': len(samples),
+        'rps': round(len(samples) / seconds, 2) if seconds else 0,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'error_rate': round(errors / len(samples), 4),
+    }
+
+
+def report(started, samples, interval=5):
+    """Итоги: в целом, по действиям и по интервалам в `interval` секунд."""
+    finished = max((end for _, _, end, _ in samples), default=started)
+    total_seconds = finished - started
+    by_action = defaultdict(list)
+    by_interval = defaultdict(list)
+    for sample in samples:
+        by_action[sample[0]].append(sample)
+        by_interval[int((sample[2] - started) // interval)].append(sample)
+    return {
+        'total': _summary(samples, total_seconds),
+        'actions': {
+            action: _summary(action_samples, total_seconds)
+            for action, action_samples in sorted(by_action.items())
+        },
+        'timeline': [
+            {'second': bucket * interval,
+             **_summary(by_interval[bucket], interval)}
+            for bucket in sorted(by_interval)
+        ],
+    }
@@ -0,0 +1,101 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import (
+    setup_test_environment, teardown_test_environment
+)
+
+from core import benchmark, dataset, scratch
+
+from .generate_dataset import add_dataset_arguments, dataset_counts
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт временную БД с синтетическими данными и меряет все '
+        'именованные страницы через тестовый клиент.'
+    )
+
+    def add_arguments(self, parser):
+        add_dataset_arguments(parser)
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=20,
+            help='Сколько раз запрашивать каждую страницу.',
+        )
+        parser.add_argument(
+            '--warm',
+            action='store_true',
+            help='Не очищать кеш перед каждым запросом.',
+        )
+        parser.add_argument(
+            '--url',
+            action='append',
+            dest='names',
+            help='Мерить только этот URL (namespace:name); можно '
+                 'повторять.',
+        )
+        parser.add_argument(
+            '--output',
+            default='bench.json',
+            help='Файл JSON-отчёта.',
+        )
+        parser.add_argument(
+            '--compare',
+            help='Отчёт предыдущего прогона для сравнения.',
+        )
+        parser.add_argument(
+            '--current-db',
+            action='store_true',
+            help='Мерить на текущей БД, без временной и без генерации.',
+        )
+
+    def handle(self, *args, **options):
+        # Кеш очищается перед каждым запросом: у замеров он свой, как
+        # и файлы метрик и журнала медленных запросов.
+        with scratch.isolated():
+            report = self.run(options)
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+        for name, result in report['results'].items():
+            self.stdout.write(
+                f'{name}: {result["status"]}, p50 {result["p50_ms"]} мс, '
+                f'p95 {result["p95_ms"]} мс, p99 {result["p99_ms"]} мс, '
+                f'запросов {result["queries"]}, '
+                f'память {result["peak_memory_kb"]} КБ'
+            )
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as baseline:
+                for line in benchmark.compare(json.load(baseline), report):
+                    self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(
+            f'Отчёт сохранён в {options["output"]}'
+        ))
+
+    def run(self, options):
+        if options['current_db']:
+            return self.measure(options)
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            counts = dataset_counts(options)
+            self.stdout.write(f'Генерация данных: {counts}')
+            dataset.generate(counts, options['seed'])
+            report = self.measure(options, as_staff=True)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        report['meta'].update(scale=options['scale'], seed=options['seed'])
+        return report
+
+    def measure(self, options, as_staff=False):
+        return benchmark.run(
+            iterations=options['iterations'],
+            cold=not options['warm'],
+            names=options['names'],
+            as_staff=as_staff,
+        )
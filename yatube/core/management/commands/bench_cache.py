@@ -0,0 +1,103 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core import cache_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает LocMemCache, FileBasedCache и SQLiteCache: время '
+        'операций и долю попаданий у нескольких процессов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=2000,
+            help='Сколько ключей писать и читать при замере операций.',
+        )
+        parser.add_argument(
+            '--batch',
+            type=int,
+            default=20,
+            help='Сколько ключей в одном set_many/get_many.',
+        )
+        parser.add_argument(
+            '--value-size',
+            type=int,
+            default=20 * 1024,
+            help='Размер значения в байтах.',
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=4,
+            help='Сколько процессов-воркеров читает кеш одновременно.',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=2000,
+            help='Сколько чтений делает каждый воркер.',
+        )
+        parser.add_argument(
+            '--keys',
+            type=int,
+            default=1000,
+            help='Сколько разных страниц читают воркеры.',
+        )
+        parser.add_argument(
+            '--capacity',
+            type=int,
+            help='Ёмкость каждого бэкенда в значениях (по умолчанию '
+                 'вмещает все ключи).',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Одинаковый seed даёт одинаковую последовательность '
+                 'чтений.',
+        )
+        parser.add_argument(
+            '--backend',
+            action='append',
+            dest='names',
+            choices=cache_benchmark.BACKENDS,
+            help='Мерить только этот бэкенд; можно повторять.',
+        )
+        parser.add_argument(
+            '--output',
+            default='bench_cache.json',
+            help='Файл JSON-отчёта.',
+        )
+
+    def handle(self, *args, **options):
+        report = cache_benchmark.run(
+            iterations=options['iterations'],
+            batch=options['batch'],
+            value_size=options['value_size'],
+            processes=options['processes'],
+            requests=options['requests'],
+            keys=options['keys'],
+            seed=options['seed'],
+            capacity=options['capacity'],
+            names=options['names'],
+        )
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+        for name, result in report['results'].items():
+            operations = ', '.join(
+                f'{operation} p50 {timing["p50_us"]} мкс'
+                for operation, timing in result['operations'].items()
+            )
+            self.stdout.write(
+                f'{name}: {operations}; воркеры: попаданий '
+                f'{result["workers"]["hit_rate"]:.1%}, '
+                f'{result["workers"]["requests_per_s"]} запросов/с'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Отчёт сохранён в {options["output"]}'
+        ))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from core import dataset
+from posts.importer import RECORD_TYPES
+
+
+def add_dataset_arguments(parser):
+    parser.add_argument(
+        '--scale',
+        choices=dataset.SCALES,
+        default='small',
+        help='Размер набора данных.',
+    )
+    for name in dataset.SCALES['tiny']:
+        parser.add_argument(
+            f'--{name}',
+            type=int,
+            help=f'Переопределить число объектов "{name}" из --scale.',
+        )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='Одинаковый seed даёт одинаковые данные.',
+    )
+
+
+def dataset_counts(options):
+    counts = dict(dataset.SCALES[options['scale']])
+    for name in counts:
+        if options.get(name) is not None:
+            counts[name] = options[name]
+    return counts
+
+
+class Command(BaseCommand):
+    help = 'Заполняет текущую БД синтетическими данными для бенчмарков.'
+
+    def add_arguments(self, parser):
+        add_dataset_arguments(parser)
+
+    def handle(self, *args, **options):
+        stats = dataset.generate(dataset_counts(options), options['seed'])
+        self.stdout.write(self.style.SUCCESS(
+            ', '.join(f'{kind}: {stats[kind]}' for kind in RECORD_TYPES)
+        ))
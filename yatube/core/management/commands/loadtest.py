@@ -0,0 +1,139 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import loadtest, scratch
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает локальный сервер на копии БД и нагружает его '
+        'параллельными клиентами с заданной смесью запросов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url',
+            help='Нагружать уже запущенный сервер вместо локального. '
+                 'Пользователи на нём не создаются: их заранее заводит '
+                 '--prepare-only с настройками этого сервера.',
+        )
+        parser.add_argument(
+            '--prepare-only',
+            action='store_true',
+            help='Только создать синтетических пользователей в текущей '
+                 'БД и выйти; они остаются в ней.',
+        )
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=8765,
+            help='Порт локального сервера.',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=8,
+            help='Число параллельных клиентов.',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=30,
+            help='Длительность нагрузки в секундах.',
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=20,
+            help='Число синтетических пользователей.',
+        )
+        parser.add_argument(
+            '--mix',
+            default=','.join(
+                f'{name}={weight}'
+                for name, weight in loadtest.DEFAULT_MIX.items()
+            ),
+            help='Веса действий: index=40,post_detail=20,...',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Шаг отчёта по времени в секундах.',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Одинаковый seed даёт одинаковую последовательность '
+                 'действий.',
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл JSON-отчёта.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            mix = loadtest.parse_mix(options['mix'])
+        except ValueError as error:
+            raise CommandError(error)
+        if options['prepare_only']:
+            usernames = loadtest.prepare_users(options['users'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Создано пользователей: {len(usernames)}'
+            ))
+            return
+        if options['base_url']:
+            usernames = loadtest.usernames(options['users'])
+            started, samples = self.load(options['base_url'], usernames,
+                                         mix, options)
+        else:
+            started, samples = self.load_local(mix, options)
+        report = loadtest.report(started, samples, options['interval'])
+        for row in report['timeline']:
+            self.stdout.write(self.format_row(f'{row["second"]:>6} с', row))
+        for action, row in report['actions'].items():
+            self.stdout.write(self.format_row(action, row))
+        self.stdout.write(self.format_row('всего', report['total']))
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f'Отчёт сохранён в {options["output"]}'
+            ))
+
+    def load_local(self, mix, options):
+        # Пользователи, посты и комментарии нагрузки остаются в копии
+        # БД, а кеш, метрики и журнал у сервера - свои.
+        with scratch.isolated() as directory, \
+                scratch.database_copy(directory):
+            usernames = loadtest.prepare_users(options['users'])
+            with loadtest.serve(
+                options['port'], scratch.environment(directory)
+            ) as base_url:
+                return self.load(base_url, usernames, mix, options)
+
+    def load(self, base_url, usernames, mix, options):
+        self.stdout.write(
+            f'Нагрузка на {base_url}: {options["concurrency"]} клиентов, '
+            f'{options["duration"]} с'
+        )
+        return loadtest.run(
+            base_url, usernames,
+            concurrency=options['concurrency'],
+            duration=options['duration'],
+            mix=mix,
+            seed=options['seed'],
+        )
+
+    @staticmethod
+    def format_row(label, row):
+        if not row['requests']:
+            return f'{label}: нет запросов'
+        return (
+            f'{label}: {row["requests"]} запросов, {row["rps"]} в с, '
+            f'p50 {row["p50_ms"]} мс, p95 {row["p95_ms"]} мс, '
+            f'p99 {row["p99_ms"]} мс, ошибок {row["error_rate"]:.1%}'
+        )
@@ -0,0 +1,195 @@
+"""Счётчики и гистограммы запросов в текстовом формате Prometheus.
+
+Каждый процесс копит приращения в памяти и раз в
+METRICS_FLUSH_INTERVAL секунд прибавляет их к общему файлу SQLite
+(settings.METRICS_DB), так что /metrics/ показывает сумму по всем
+процессам сервера. Гистограммы хранятся сразу накопленными: замер
+увеличивает каждый бакет с границей не меньше значения.
+
+Остаток приращений процесс дописывает при обычном завершении
+(atexit); процесс, убитый сигналом без обработчика (SIGKILL),
+теряет замеры последних METRICS_FLUSH_INTERVAL секунд.
+"""
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+# Имя -> (тип, описание) для строк HELP и TYPE.
+METRICS = {
+    'yatube_requests_total': (
+        'counter', 'Запросы по имени URL и коду ответа.'
+    ),
+    'yatube_request_cache_total': (
+        'counter', 'Запросы по имени URL и исходу обращений к кешу.'
+    ),
+    'yatube_request_duration_seconds': (
+        'histogram', 'Время ответа по имени URL.'
+    ),
+    'yatube_request_queries': (
+        'histogram', 'Число SQL-запросов на запрос по имени URL.'
+    ),
+}
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS metric ('
+    'name TEXT NOT NULL, labels TEXT NOT NULL, value REAL NOT NULL, '
+    'PRIMARY KEY (name, labels))'
+)
+UPSERT = (
+    'INSERT INTO metric (name, labels, value) VALUES (?, ?, ?) '
+    'ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value'
+)
+
+_lock = threading.Lock()
+_pending = Counter()
+_last_flush = time.monotonic()
+
+
+def _escape(value):
+    return (
+        str(value).replace('\\', r'\\').replace('"', r'\"')
+        .replace('\n', r'\n')
+    )
+
+
+def _labels(**labels):
+    return ','.join(
+        f'{key}="{_escape(value)}"' for key, value in labels.items()
+    )
+
+
+def _format_bound(bound):
+    return '+Inf' if bound is None else f'{bound:g}'
+
+
+def _observe(name, value, buckets, **labels):
+    _pending[name + '_count', _labels(**labels)] += 1
+    _pending[name + '_sum', _labels(**labels)] += value
+    # Пустые бакеты тоже заводятся: у гистограммы должны быть все.
+    for bound in (*buckets, None):
+        _pending[
+            name + '_bucket', _labels(**labels, le=_format_bound(bound))
+        ] += int(bound is None or value <= bound)
+
+
+def cache_outcome(hits, misses):
+    """Исход обращений к кешу за запрос: hit, miss или none."""
+    if misses:
+        return 'miss'
+    return 'hit' if hits else 'none'
+
+
+def observe_request(view, status, seconds, queries, cache):
+    """Учитывает запрос; cache - исход из cache_outcome()."""
+    with _lock:
+        _pending['yatube_requests_total', _labels(
+            view=view, status=status
+        )] += 1
+        _pending['yatube_request_cache_total', _labels(
+            view=view, outcome=cache
+        )] += 1
+        _observe(
+            'yatube_request_duration_seconds', seconds, LATENCY_BUCKETS,
+            view=view,
+        )
+        _observe('yatube_request_queries', queries, QUERY_BUCKETS, view=view)
+        due = (
+            time.monotonic() - _last_flush
+            >= settings.METRICS_FLUSH_INTERVAL
+        )
+    if due:
+        flush()
+
+
+def _connect():
+    os.makedirs(
+        os.path.dirname(settings.METRICS_DB), mode=0o700, exist_ok=True
+    )
+    connection = sqlite3.connect(settings.METRICS_DB, timeout=10)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute(SCHEMA)
+    return connection
+
+
+def flush():
+    """Прибавляет накопленные приращения к общему файлу."""
+    global _last_flush
+    with _lock:
+        pending = list(_pending.items())
+        _pending.clear()
+        _last_flush = time.monotonic()
+    if not pending:
+        return
+    connection = _connect()
+    try:
+        with connection:
+            connection.executemany(
+                UPSERT, [(name, labels, value)
+                         for (name, labels), value in pending]
+            )
+    finally:
+        connection.close()
+
+
+atexit.register(flush)
+
+
+def reset():
+    """Обнуляет все метрики всех процессов."""
+    with _lock:
+        _pending.clear()
+    connection = _connect()
+    try:
+        with connection:
+            connection.execute('DELETE FROM metric')
+    finally:
+        connection.close()
+
+
+def _family(sample_name):
+    for suffix in ('_bucket', '_count', '_sum'):
+        base = sample_name[:-len(suffix)]
+        if sample_name.endswith(suffix) and base in METRICS:
+            return base
+    return sample_name
+
+
+def _sort_key(row):
+    # Сначала бакеты серии по возрастанию границы, затем _count и _sum.
+    name, labels, _ = row
+    head, separator, bound = labels.rpartition(',le="')
+    if not separator:
+        return labels, 1, 0, name
+    bound = bound.rstrip('"')
+    return head, 0, float('inf') if bound == '+Inf' else float(bound), name
+
+
+def render():
+    """Все метрики в текстовом формате Prometheus 0.0.4."""
+    flush()
+    connection = _connect()
+    try:
+        rows = connection.execute(
+            'SELECT name, labels, value FROM metric'
+        ).fetchall()
+    finally:
+        connection.close()
+    families = {}
+    for name, labels, value in rows:
+        families.setdefault(_family(name), []).append((name, labels, value))
+    lines = []
+    for family in sorted(families):
+        kind, description = METRICS.get(family, ('untyped', family))
+        lines.append(f'# HELP {family} {description}')
+        lines.append(f'# TYPE {family} {kind}')
+        for name, labels, value in sorted(families[family], key=_sort_key):
+            if value.is_integer():
+                value = int(value)
+            lines.append(f'{name}{{{labels}}} {value}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,91 @@
+import json
+import logging
+import random
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics as registry
+from . import slow_queries, timing
+
+logger = logging.getLogger('yatube.timing')
+
+
+class ServerTimingMiddleware:
+    """Замеряет запросы и отдаёт замеры в core.metrics, в заголовке
+    Server-Timing и в строке лога с именем URL.
+
+    Метрики (METRICS_ENABLED) учитывают каждый запрос. Заголовок и
+    лог получает только доля REQUEST_TIMING_SAMPLE_RATE запросов, а
+    в лог попадают лишь запросы не быстрее
+    REQUEST_TIMING_LOG_THRESHOLD_MS. Заголовок раскрывает число
+    запросов к БД и тайминги, поэтому без REQUEST_TIMING_HEADER его
+    получают только сотрудники.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        timing.install_template_timing()
+        timing.install_cache_timing()
+
+    def __call__(self, request):
+        sampled = random.random() < settings.REQUEST_TIMING_SAMPLE_RATE
+        if not (sampled or settings.METRICS_ENABLED):
+            return self.get_response(request)
+        with timing.collect() as metrics:
+            response = self.get_response(request)
+        record = metrics.as_dict()
+        match = request.resolver_match
+        view_name = match.view_name if match else None
+        if settings.METRICS_ENABLED:
+            registry.observe_request(
+                view=view_name or 'unmatched',
+                status=response.status_code,
+                seconds=record['total_ms'] / 1000,
+                queries=metrics.db_count,
+                cache=registry.cache_outcome(
+                    metrics.cache_hits, metrics.cache_misses
+                ),
+            )
+        if sampled:
+            self.report(request, response, metrics, record, view_name)
+        return response
+
+    def report(self, request, response, metrics, record, view_name):
+        if self.show_header(request):
+            response['Server-Timing'] = metrics.server_timing()
+        if record['total_ms'] >= settings.REQUEST_TIMING_LOG_THRESHOLD_MS:
+            logger.info(json.dumps({
+                'url_name': view_name,
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                **record,
+            }))
+
+    @staticmethod
+    def show_header(request):
+        if settings.REQUEST_TIMING_HEADER:
+            return True
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_staff
+
+
+class SlowQueryMiddleware:
+    """Пишет в журнал медленные SQL-запросы (core.slow_queries)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        slow_queries._local.request = request
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(
+                        slow_queries.query_wrapper
+                    ))
+                return self.get_response(request)
+        finally:
+            slow_queries._local.request = None
@@ -0,0 +1,122 @@
+"""Временные рабочие файлы для замеров и тестов.
+
+Кеш, файл метрик и журнал медленных запросов живого сервера лежат в
+VAR_DIR и рядом с проектом. Тесты, bench и loadtest гоняют сайт на
+синтетических данных, а кеш ещё и очищают, поэтому работают с
+копиями этих файлов во временном каталоге: isolated() переключает на
+него текущий процесс, database_copy() - его соединение с БД, а сервер,
+которого поднимает loadtest, читает каталог из переменной окружения
+ENVIRONMENT_VARIABLE в настройках yatube.scratch_settings.
+"""
+import copy
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from . import metrics
+
+ENVIRONMENT_VARIABLE = 'YATUBE_SCRATCH_DIR'
+SETTINGS_MODULE = 'yatube.scratch_settings'
+DATABASE = 'db.sqlite3'
+SLOW_QUERY_LOGGER = 'yatube.slow_queries'
+
+
+def overrides(directory):
+    """Настройки с рабочими файлами в directory: у каждого псевдонима
+    кеша свой файл, отдельные метрики и журнал медленных запросов."""
+    caches = copy.deepcopy(settings.CACHES)
+    for alias, options in caches.items():
+        options['LOCATION'] = os.path.join(
+            directory, f'cache-{alias}.sqlite3'
+        )
+    return {
+        'CACHES': caches,
+        'METRICS_DB': os.path.join(directory, 'metrics.sqlite3'),
+        'SLOW_QUERY_LOG_FILE': os.path.join(directory, 'slow_queries.log'),
+    }
+
+
+@contextmanager
+def _slow_query_log(path):
+    # Обработчик из LOGGING открыт на файл из настроек при старте,
+    # override_settings его не перенастраивает.
+    logger = logging.getLogger(SLOW_QUERY_LOGGER)
+    handlers = logger.handlers
+    handler = logging.FileHandler(path, encoding='utf-8', delay=True)
+    logger.handlers = [handler]
+    try:
+        yield
+    finally:
+        logger.handlers = handlers
+        handler.close()
+
+
+@contextmanager
+def isolated():
+    """Переносит кеш, метрики и журнал медленных запросов процесса во
+    временный каталог, отдаёт его путь и удаляет его на выходе."""
+    # Замеры до переключения остаются в прежнем файле.
+    metrics.flush()
+    directory = tempfile.mkdtemp(prefix='yatube-scratch-')
+    values = overrides(directory)
+    try:
+        with override_settings(**values), \
+                _slow_query_log(values['SLOW_QUERY_LOG_FILE']):
+            try:
+                yield directory
+            finally:
+                metrics.flush()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+@contextmanager
+def database_copy(directory):
+    """Копирует БД SQLite в directory и на время блока переключает на
+    копию соединение текущего процесса."""
+    path = os.path.join(directory, DATABASE)
+    original = connection.settings_dict['NAME']
+    source = sqlite3.connect(original)
+    target = sqlite3.connect(path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    connection.close()
+    connection.settings_dict['NAME'] = path
+    try:
+        yield path
+    finally:
+        connection.close()
+        connection.settings_dict['NAME'] = original
+
+
+def environment(directory):
+    """Окружение дочернего процесса с настройками SETTINGS_MODULE."""
+    return {
+        **os.environ,
+        'DJANGO_SETTINGS_MODULE': SETTINGS_MODULE,
+        ENVIRONMENT_VARIABLE: directory,
+    }
+
+
+class TestRunner(DiscoverRunner):
+    """Прогон manage.py test внутри isolated()."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._scratch = ExitStack()
+        self._scratch.enter_context(isolated())
+
+    def teardown_test_environment(self, **kwargs):
+        self._scratch.close()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,192 @@
+"""Журнал медленных SQL-запросов с планом выполнения.
+
+SlowQueryMiddleware ставит на время запроса обёртку
+connection.execute_wrapper; запрос дольше SLOW_QUERY_THRESHOLD_MS
+пишется JSON-строкой в лог yatube.slow_queries (в настройках это
+ротируемый файл SLOW_QUERY_LOG_FILE) вместе с параметрами, именем
+URL, строкой кода и шаблона, откуда он пришёл, и планом EXPLAIN.
+У запросов к таблицам с хешами паролей и ключами сессий
+(SENSITIVE_TABLES) вместо параметров пишутся только их типы и длины.
+aggregate() сводит записи журнала по отпечатку - SQL, в котором
+литералы и параметры заменены на `?`, а списки в IN свёрнуты.
+"""
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import DatabaseError, NotSupportedError
+
+logger = logging.getLogger('yatube.slow_queries')
+
+_local = threading.local()
+# Сами обёртки замеров - не источник запроса.
+INSTRUMENTATION_FILES = {
+    os.path.join(os.path.dirname(__file__), name)
+    for name in ('slow_queries.py', 'timing.py', 'middleware.py')
+}
+SENSITIVE_TABLES = re.compile(
+    r'\b(?:auth_user|django_session)\b', re.IGNORECASE
+)
+FINGERPRINT_RULES = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(?)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+def fingerprint(sql):
+    """SQL без литералов и параметров и его короткий хеш."""
+    normalized = sql
+    for pattern, replacement in FINGERPRINT_RULES:
+        normalized = pattern.sub(replacement, normalized)
+    normalized = normalized.strip()
+    return hashlib.md5(normalized.encode()).hexdigest()[:12], normalized
+
+
+def _describe(value):
+    try:
+        return f'<{type(value).__name__} len={len(value)}>'
+    except TypeError:
+        return f'<{type(value).__name__}>'
+
+
+def redact(sql, params):
+    """Параметры запроса для журнала: repr значений, а у запросов к
+    SENSITIVE_TABLES - только типы и длины."""
+    if SENSITIVE_TABLES.search(sql):
+        return [_describe(value) for value in params or ()]
+    return [repr(value) for value in params or ()]
+
+
+def _origin():
+    """Строка кода проекта и строка шаблона, откуда пришёл запрос."""
+    source = template = None
+    frame = sys._getframe(2)
+    while frame is not None and (source is None or template is None):
+        code = frame.f_code
+        node = frame.f_locals.get('self')
+        if (
+            template is None
+            and code.co_name == 'render_annotated'
+            and getattr(node, 'token', None) is not None
+        ):
+            origin = getattr(node, 'origin', None)
+            name = getattr(origin, 'template_name', None) or origin
+            template = f'{name}:{node.token.lineno}'
+        elif (
+            source is None
+            and code.co_filename.startswith(settings.BASE_DIR)
+            and code.co_filename not in INSTRUMENTATION_FILES
+        ):
+            path = os.path.relpath(code.co_filename, settings.BASE_DIR)
+            source = f'{path}:{frame.f_lineno} {code.co_name}'
+        frame = frame.f_back
+    return source, template
+
+
+def explain(connection, sql, params):
+    """План выполнения SELECT строками или None."""
+    if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return None
+    try:
+        prefix = connection.ops.explain_query_prefix()
+        # Свой курсор бэкенда: мимо обёрток и не сбивая
+        # результат исходного запроса.
+        cursor = connection.create_cursor()
+        try:
+            cursor.execute(f'{prefix} {sql}', params)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+    except (DatabaseError, NotSupportedError):
+        return None
+    return [' '.join(str(value) for value in row) for row in rows]
+
+
+def _record(context, sql, params, many, milliseconds):
+    request = getattr(_local, 'request', None)
+    match = getattr(request, 'resolver_match', None)
+    source, template = _origin()
+    key, _ = fingerprint(sql)
+    logger.warning(json.dumps({
+        'time': datetime.now(timezone.utc).isoformat(),
+        'duration_ms': round(milliseconds, 2),
+        'fingerprint': key,
+        'sql': sql,
+        'params': None if many else redact(sql, params),
+        'view': match.view_name if match else None,
+        'path': request.path if request is not None else None,
+        'source': source,
+        'template': template,
+        'plan': None if many else explain(
+            context['connection'], sql, params
+        ),
+    }, ensure_ascii=False))
+
+
+def query_wrapper(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        milliseconds = (time.perf_counter() - started) * 1000
+        if milliseconds >= settings.SLOW_QUERY_THRESHOLD_MS:
+            _record(context, sql, params, many, milliseconds)
+
+
+def read_records():
+    """Записи журнала вместе с ротированными файлами."""
+    for path in sorted(glob.glob(glob.escape(settings.SLOW_QUERY_LOG_FILE)
+                                 + '*')):
+        with open(path, encoding='utf-8') as log:
+            for line in log:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def aggregate(records):
+    """Сводка по отпечаткам, самые затратные в сумме - первыми."""
+    groups = {}
+    for record in records:
+        key, normalized = fingerprint(record['sql'])
+        group = groups.setdefault(key, {
+            'fingerprint': key,
+            'sql': normalized,
+            'count': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'views': set(),
+            'origins': set(),
+            'example': record,
+        })
+        group['count'] += 1
+        group['total_ms'] += record['duration_ms']
+        if record['duration_ms'] >= group['max_ms']:
+            group['max_ms'] = record['duration_ms']
+            group['example'] = record
+        if record.get('view'):
+            group['views'].add(record['view'])
+        for origin in (record.get('source'), record.get('template')):
+            if origin:
+                group['origins'].add(origin)
+    result = sorted(
+        groups.values(), key=lambda group: group['total_ms'], reverse=True
+    )
+    for group in result:
+        group['avg_ms'] = round(group['total_ms'] / group['count'], 2)
+        group['total_ms'] = round(group['total_ms'], 2)
+        group['views'] = sorted(group['views'])
+        group['origins'] = sorted(group['origins'])
+    return result
@@ -0,0 +1,288 @@
+"""Бэкенд кеша Django в одном файле SQLite, общий для всех процессов.
+
+LocMemCache у каждого процесса сервера свой: с ростом числа
+воркеров копии страниц множатся, а доля попаданий падает. Этот бэкенд
+хранит записи в файле SQLite в режиме WAL: читатели не ждут
+писателя, чтение идёт через отображение файла в память (mmap), запись
+- одна короткая транзакция.
+
+Размер ограничен в байтах (OPTIONS['MAX_SIZE']): сумму размеров
+значений ведут триггеры, и когда она превышает предел, удаляются
+сначала истёкшие, а затем давно не читанные записи, пока не
+освободится 1/CULL_FREQUENCY предела (LRU). Время чтения
+записывается не чаще раза в ACCESS_RESOLUTION секунд на ключ, чтобы
+горячие ключи не превращали каждое чтение в запись.
+
+Значения хранятся в pickle, и чужая запись в файле исполнилась бы
+при чтении. Поэтому каталог файла создаётся с правами 0700, сам файл
+- 0600, а файл, который доступен не только владельцу процесса или
+оказался ссылкой, бэкенд не открывает.
+
+    CACHES = {'default': {
+        'BACKEND': 'core.sqlite_cache.SQLiteCache',
+        'LOCATION': os.path.join(VAR_DIR, 'cache.sqlite3'),
+        'OPTIONS': {'MAX_SIZE': 256 * 1024 * 1024},
+    }}
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.exceptions import ImproperlyConfigured
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache_entry (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_entry_accessed ON cache_entry (accessed);
+CREATE TABLE IF NOT EXISTS cache_size (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    total INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_size (id, total) VALUES (0, 0);
+CREATE TRIGGER IF NOT EXISTS cache_entry_inserted
+AFTER INSERT ON cache_entry BEGIN
+    UPDATE cache_size SET total = total + new.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entry_updated
+AFTER UPDATE OF size ON cache_entry BEGIN
+    UPDATE cache_size SET total = total + new.size - old.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entry_deleted
+AFTER DELETE ON cache_entry BEGIN
+    UPDATE cache_size SET total = total - old.size;
+END;
+'''
+# Запись без срока хранится с expires = NULL.
+LIVE = '(expires IS NULL OR expires > ?)'
+UPSERT = (
+    'INSERT INTO cache_entry (key, value, size, expires, accessed) '
+    'VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+    'value = excluded.value, size = excluded.size, '
+    'expires = excluded.expires, accessed = excluded.accessed'
+)
+# Занятый живой записью ключ add() не трогает.
+ADD = UPSERT + ' WHERE cache_entry.expires <= excluded.accessed'
+# Предел числа параметров запроса в старых сборках SQLite - 999.
+CHUNK_SIZE = 900
+
+
+def _chunks(items):
+    for start in range(0, len(items), CHUNK_SIZE):
+        yield items[start:start + CHUNK_SIZE]
+
+
+def _placeholders(items):
+    return ', '.join('?' * len(items))
+
+
+def _open_private(path):
+    """Создаёт файл кеша, доступный только владельцу, или проверяет,
+    что таков уже существующий."""
+    os.makedirs(os.path.dirname(path) or '.', mode=0o700, exist_ok=True)
+    descriptor = os.open(
+        path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600
+    )
+    try:
+        info = os.fstat(descriptor)
+    finally:
+        os.close(descriptor)
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise ImproperlyConfigured(
+            f'Файл кеша {path} должен принадлежать пользователю '
+            f'процесса и быть доступен только ему (0600).'
+        )
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_size = int(options.get('MAX_SIZE', 64 * 1024 * 1024))
+        self._access_resolution = float(options.get('ACCESS_RESOLUTION', 1))
+        self._local = threading.local()
+
+    @property
+    def _connection(self):
+        # Соединение своё у каждого потока и у каждого процесса
+        # после fork.
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            _open_private(self._path)
+            connection = sqlite3.connect(
+                self._path, timeout=10, isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(f'PRAGMA mmap_size={self._max_size * 2}')
+            connection.executescript(SCHEMA)
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    def _write(self, callback):
+        """Выполняет callback(connection) в транзакции записи и
+        вытесняет записи, если кеш перерос предел."""
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            result = callback(connection)
+            self._cull(connection)
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return result
+
+    def _cull(self, connection):
+        total, = connection.execute(
+            'SELECT total FROM cache_size'
+        ).fetchone()
+        if total <= self._max_size:
+            return
+        connection.execute(
+            'DELETE FROM cache_entry WHERE expires <= ?', (time.time(),)
+        )
+        excess = (
+            connection.execute('SELECT total FROM cache_size').fetchone()[0]
+            - self._max_size + self._max_size // self._cull_frequency
+        )
+        if excess <= 0:
+            return
+        victims = []
+        rows = connection.execute(
+            'SELECT key, size FROM cache_entry ORDER BY accessed'
+        )
+        for key, size in rows:
+            victims.append(key)
+            excess -= size
+            if excess <= 0:
+                break
+        rows.close()
+        for chunk in _chunks(victims):
+            connection.execute(
+                'DELETE FROM cache_entry WHERE key IN '
+                f'({_placeholders(chunk)})',
+                chunk,
+            )
+
+    def _row(self, key, value, timeout):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        return (
+            key, data, len(data), self.get_backend_timeout(timeout),
+            time.time(),
+        )
+
+    def _read(self, keys):
+        """Живые записи ключей: {ключ: значение}."""
+        now = time.time()
+        found, stale = {}, []
+        for chunk in _chunks(keys):
+            rows = self._connection.execute(
+                'SELECT key, value, accessed FROM cache_entry '
+                f'WHERE key IN ({_placeholders(chunk)}) AND {LIVE}',
+                (*chunk, now),
+            )
+            for key, value, accessed in rows:
+                found[key] = pickle.loads(value)
+                if now - accessed >= self._access_resolution:
+                    stale.append(key)
+        if stale:
+            self._touch_accessed(stale, now)
+        return found
+
+    def _touch_accessed(self, keys, now):
+        def update(connection):
+            for chunk in _chunks(keys):
+                connection.execute(
+                    'UPDATE cache_entry SET accessed = ? WHERE key IN '
+                    f'({_placeholders(chunk)})',
+                    (now, *chunk),
+                )
+        try:
+            self._write(update)
+        except sqlite3.OperationalError:
+            # Отметка чтения не стоит ожидания занятой БД.
+            pass
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        row = self._row(self._key(key, version), value, timeout)
+        return self._write(
+            lambda connection: connection.execute(ADD, row).rowcount > 0
+        )
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._read([key]).get(key, default)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        row = self._row(self._key(key, version), value, timeout)
+        self._write(lambda connection: connection.execute(UPSERT, row))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        return self._write(lambda connection: connection.execute(
+            f'UPDATE cache_entry SET expires = ? WHERE key = ? AND {LIVE}',
+            (self.get_backend_timeout(timeout), key, time.time()),
+        ).rowcount > 0)
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def has_key(self, key, version=None):
+        return self._connection.execute(
+            f'SELECT 1 FROM cache_entry WHERE key = ? AND {LIVE}',
+            (self._key(key, version), time.time()),
+        ).fetchone() is not None
+
+    def get_many(self, keys, version=None):
+        names = {self._key(key, version): key for key in keys}
+        found = self._read(list(names))
+        return {names[key]: value for key, value in found.items()}
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        rows = [
+            self._row(self._key(key, version), value, timeout)
+            for key, value in data.items()
+        ]
+        if rows:
+            self._write(
+                lambda connection: connection.executemany(UPSERT, rows)
+            )
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+
+        def delete(connection):
+            for chunk in _chunks(keys):
+                connection.execute(
+                    'DELETE FROM cache_entry WHERE key IN '
+                    f'({_placeholders(chunk)})',
+                    chunk,
+                )
+        if keys:
+            self._write(delete)
+
+    def clear(self):
+        self._write(
+            lambda connection: connection.execute('DELETE FROM cache_entry')
+        )
+
+    def size(self):
+        """Сумма размеров сохранённых значений в байтах."""
+        return self._connection.execute(
+            'SELECT total FROM cache_size'
+        ).fetchone()[0]
@@ -0,0 +1,53 @@
+from collections import Counter
+from itertools import islice
+
+from django.test import TestCase
+
+from core import benchmark, dataset
+from posts.models import Follow, Post
+
+COUNTS = dataset.SCALES['tiny']
+
+
+class DatasetTests(TestCase):
+    def test_records_are_reproducible(self):
+        first = list(islice(dataset.records(COUNTS, seed=7), 300))
+        second = list(islice(dataset.records(COUNTS, seed=7), 300))
+        other = list(islice(dataset.records(COUNTS, seed=8), 300))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+
+    def test_generated_data_follows_power_law(self):
+        dataset.generate(COUNTS, seed=1)
+        self.assertEqual(Post.objects.count(), COUNTS['posts'])
+        posts = Counter(Post.objects.values_list('author_id', flat=True))
+        followers = Counter(Follow.objects.values_list('author', flat=True))
+        # Самый популярный автор заметно опережает среднего.
+        average = COUNTS['posts'] / COUNTS['users']
+        self.assertGreater(posts.most_common(1)[0][1], 3 * average)
+        self.assertGreater(
+            followers.most_common(1)[0][1],
+            3 * sum(followers.values()) / COUNTS['users'],
+        )
+
+
+class BenchmarkTests(TestCase):
+    def test_run_reports_every_url(self):
+        dataset.generate(COUNTS, seed=1)
+        report = benchmark.run(iterations=2)
+        names = {name for name, _ in benchmark.url_names()}
+        self.assertEqual(set(report['results']), names)
+        result = report['results']['posts:index']
+        self.assertEqual(result['status'], 200)
+        self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        self.assertGreater(result['queries'], 0)
+        self.assertGreater(result['peak_memory_kb'], 0)
+        self.assertEqual(
+            len(benchmark.compare(report, report)), len(names)
+        )
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertEqual(benchmark.percentile([5], 95), 5)
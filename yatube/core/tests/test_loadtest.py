@@ -0,0 +1,76 @@
+import threading
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.servers.basehttp import ThreadedWSGIServer
+from django.test import LiveServerTestCase
+from django.test.testcases import LiveServerThread, QuietWSGIRequestHandler
+
+from core import dataset, loadtest
+from posts.models import Comment, Post, User
+
+
+class SerialWSGIServer(ThreadedWSGIServer):
+    # Потоки тестового сервера делят одно соединение с SQLite в памяти,
+    # и параллельные транзакции записи перемешиваются на нём. Соединения
+    # клиентов обслуживаются параллельно, а сами запросы - по очереди.
+    def set_app(self, application):
+        lock = threading.Lock()
+
+        def serial(environ, start_response):
+            with lock:
+                return application(environ, start_response)
+
+        super().set_app(serial)
+
+
+class SerialLiveServerThread(LiveServerThread):
+    def _create_server(self):
+        return SerialWSGIServer(
+            (self.host, self.port), QuietWSGIRequestHandler,
+            allow_reuse_address=False,
+        )
+
+
+class LoadTestTests(LiveServerTestCase):
+    server_thread_class = SerialLiveServerThread
+
+    def test_run_reports_every_action(self):
+        dataset.generate(dataset.SCALES['tiny'], seed=1)
+        posts, comments = Post.objects.count(), Comment.objects.count()
+        usernames = loadtest.prepare_users(2)
+        started, samples = loadtest.run(
+            self.live_server_url, usernames, concurrency=2, duration=1.5,
+            mix={name: 1 for name in loadtest.DEFAULT_MIX},
+        )
+        report = loadtest.report(started, samples, interval=0.5)
+        self.assertEqual(report['total']['requests'], len(samples))
+        self.assertEqual(report['total']['error_rate'], 0)
+        self.assertEqual(set(report['actions']), set(loadtest.DEFAULT_MIX))
+        self.assertGreater(len(report['timeline']), 1)
+        # Запись идёт от имени вошедших пользователей.
+        self.assertEqual(
+            Post.objects.count() - posts,
+            report['actions']['post_create']['requests'],
+        )
+        self.assertEqual(
+            Comment.objects.count() - comments,
+            report['actions']['add_comment']['requests'],
+        )
+
+    def test_prepare_only_creates_users(self):
+        call_command(
+            'loadtest', prepare_only=True, users=3, stdout=StringIO()
+        )
+        self.assertEqual(
+            set(User.objects.values_list('username', flat=True)),
+            set(loadtest.usernames(3)),
+        )
+
+    def test_parse_mix(self):
+        self.assertEqual(
+            loadtest.parse_mix('index=3, post_detail=1'),
+            {'index': 3, 'post_detail': 1},
+        )
+        with self.assertRaises(ValueError):
+            loadtest.parse_mix('unknown=1')
@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from posts.models import Post, User
+
+METRICS_DIR = tempfile.mkdtemp()
+
+
+@override_settings(METRICS_DB=os.path.join(METRICS_DIR, 'metrics.sqlite3'))
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        Post.objects.create(author=cls.staff, text='Тестовый пост')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(METRICS_DIR, ignore_errors=True)
+
+    def setUp(self):
+        metrics.reset()
+
+    def test_histogram_is_cumulative(self):
+        metrics.observe_request('posts:index', 200, 0.03, 4, 'miss')
+        metrics.observe_request('posts:index', 200, 0.2, 4, 'hit')
+        text = metrics.render()
+        for line in (
+            '# TYPE yatube_request_duration_seconds histogram',
+            'yatube_request_duration_seconds_bucket'
+            '{view="posts:index",le="0.025"} 0',
+            'yatube_request_duration_seconds_bucket'
+            '{view="posts:index",le="0.05"} 1',
+            'yatube_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"} 2',
+            'yatube_request_duration_seconds_count{view="posts:index"} 2',
+            'yatube_request_queries_bucket{view="posts:index",le="5"} 2',
+            'yatube_requests_total{view="posts:index",status="200"} 2',
+            'yatube_request_cache_total{view="posts:index",outcome="hit"} 1',
+        ):
+            self.assertIn(line + '\n', text)
+
+    def test_endpoint_requires_staff(self):
+        url = reverse('metrics')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302)
+        self.client.force_login(self.staff)
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(
+            response,
+            'yatube_requests_total{view="posts:index",status="200"} 1',
+        )
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_counted(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertIn(
+            'yatube_requests_total{view="posts:index",status="200"} 1\n',
+            metrics.render(),
+        )
@@ -0,0 +1,28 @@
+import logging
+import os
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase
+
+from core import metrics, scratch
+
+
+class IsolatedTests(TestCase):
+    def test_working_files_move_to_scratch_directory(self):
+        cache.set('outside', 1)
+        metrics_db = settings.METRICS_DB
+        with scratch.isolated() as directory:
+            self.assertEqual(
+                os.path.dirname(settings.METRICS_DB), directory
+            )
+            self.assertIsNone(cache.get('outside'))
+            cache.set('inside', 1)
+            metrics.observe_request('posts:index', 200, 0.01, 1, 'none')
+            self.assertIn('view="posts:index"', metrics.render())
+            logging.getLogger(scratch.SLOW_QUERY_LOGGER).warning('{}')
+            self.assertTrue(os.path.exists(settings.SLOW_QUERY_LOG_FILE))
+        self.assertFalse(os.path.exists(directory))
+        self.assertEqual(settings.METRICS_DB, metrics_db)
+        self.assertEqual(cache.get('outside'), 1)
+        self.assertIsNone(cache.get('inside'))
@@ -0,0 +1,95 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import slow_queries
+from posts.models import Post, User
+
+LOG_DIR = tempfile.mkdtemp()
+
+
+@override_settings(
+    SLOW_QUERY_LOG_FILE=os.path.join(LOG_DIR, 'slow_queries.log')
+)
+class SlowQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        Post.objects.create(author=cls.staff, text='Тестовый пост')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(LOG_DIR, ignore_errors=True)
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_records_view_origin_and_plan(self):
+        cache.clear()
+        with self.assertLogs('yatube.slow_queries', 'WARNING') as logs:
+            self.client.get(reverse('posts:index'))
+        records = [json.loads(line.getMessage()) for line in logs.records]
+        feed = [
+            record for record in records
+            if 'FROM "posts_post"' in record['sql']
+        ]
+        self.assertTrue(feed)
+        record = feed[0]
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertTrue(record['source'].startswith('posts/'))
+        self.assertTrue(record['plan'])
+        self.assertEqual(record['fingerprint'],
+                         slow_queries.fingerprint(record['sql'])[0])
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_sensitive_params_are_not_logged(self):
+        self.client.force_login(self.staff)
+        session_key = self.client.session.session_key
+        with self.assertLogs('yatube.slow_queries', 'WARNING') as logs:
+            self.client.get(reverse('posts:index'))
+        records = [json.loads(line.getMessage()) for line in logs.records]
+        session = [
+            record for record in records
+            if 'FROM "django_session"' in record['sql']
+        ]
+        self.assertTrue(session)
+        self.assertNotIn(session_key, json.dumps(records))
+        self.assertIn(
+            f'<str len={len(session_key)}>', session[0]['params']
+        )
+
+    def test_fingerprint_ignores_literals_and_list_length(self):
+        first = slow_queries.fingerprint(
+            'SELECT * FROM t WHERE id IN (%s, %s) AND name = \'a\' LIMIT 10'
+        )
+        second = slow_queries.fingerprint(
+            'SELECT *  FROM t WHERE id IN (%s) AND name = \'b\' LIMIT 20'
+        )
+        self.assertEqual(first, second)
+
+    def test_admin_page_aggregates_log(self):
+        record = {
+            'sql': 'SELECT * FROM posts_post WHERE id = %s',
+            'params': ['1'], 'view': 'posts:post_detail',
+            'source': 'posts/views.py:80 post_detail',
+            'template': None, 'plan': ['SEARCH posts_post'],
+        }
+        with open(settings.SLOW_QUERY_LOG_FILE, 'w') as log:
+            for duration in (120, 300):
+                log.write(json.dumps({**record, 'duration_ms': duration}))
+                log.write('\n')
+        groups = slow_queries.aggregate(slow_queries.read_records())
+        self.assertEqual(len(groups), 1)
+        self.assertEqual(groups[0]['count'], 2)
+        self.assertEqual(groups[0]['max_ms'], 300)
+        url = reverse('slow_queries')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.staff)
+        response = self.client.get(url)
+        self.assertContains(response, groups[0]['fingerprint'])
+        self.assertContains(response, 'SEARCH posts_post')
@@ -0,0 +1,84 @@
+import os
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+
+from core import cache_benchmark
+from core.sqlite_cache import SQLiteCache
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.path, {'OPTIONS': options})
+
+    def test_basic_operations(self):
+        cache = self.cache
+        cache.set('page', {'html': 'лента'})
+        self.assertEqual(cache.get('page'), {'html': 'лента'})
+        self.assertFalse(cache.add('page', 'другая'))
+        self.assertTrue(cache.add('lock', 1, 10))
+        self.assertEqual(
+            cache.get_many(['page', 'lock', 'missing']),
+            {'page': {'html': 'лента'}, 'lock': 1},
+        )
+        cache.set_many({'a': 1, 'b': 2})
+        cache.delete_many(['a', 'page'])
+        self.assertEqual(cache.get_many(['a', 'b', 'page']), {'b': 2})
+        cache.clear()
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.size(), 0)
+
+    def test_file_is_private(self):
+        self.cache.set('page', 'лента')
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+        os.chmod(self.path, 0o644)
+        with self.assertRaises(ImproperlyConfigured):
+            self.make_cache().get('page')
+
+    def test_expired_entries_are_invisible_and_replaceable(self):
+        self.cache.set('page', 'старая', -1)
+        self.assertIsNone(self.cache.get('page'))
+        self.assertFalse(self.cache.has_key('page'))
+        self.assertTrue(self.cache.add('page', 'новая'))
+        self.assertEqual(self.cache.get('page'), 'новая')
+
+    def test_processes_share_entries(self):
+        self.cache.set('page', 'общая')
+        self.assertEqual(self.make_cache().get('page'), 'общая')
+
+    def test_least_recently_read_entries_are_evicted(self):
+        value = b'x' * 1000
+        cache = self.make_cache(
+            MAX_SIZE=5500, CULL_FREQUENCY=5, ACCESS_RESOLUTION=0
+        )
+        for number in range(5):
+            cache.set(f'page:{number}', value)
+        cache.get('page:0')
+        cache.set('page:5', value)
+        self.assertLessEqual(cache.size(), 5500)
+        self.assertEqual(
+            sorted(cache.get_many([f'page:{n}' for n in range(6)])),
+            ['page:0', 'page:3', 'page:4', 'page:5'],
+        )
+
+    def test_benchmark_compares_backends(self):
+        report = cache_benchmark.run(
+            iterations=20, batch=5, value_size=100, processes=2,
+            requests=50, keys=10,
+        )
+        self.assertEqual(
+            set(report['results']), set(cache_benchmark.BACKENDS)
+        )
+        for result in report['results'].values():
+            self.assertEqual(
+                set(result['operations']),
+                {'set', 'get', 'set_many', 'get_many'},
+            )
+            self.assertGreater(result['workers']['hit_rate'], 0)
@@ -0,0 +1,52 @@
+import json
+
+from django.core.cache import cache, caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+
+
+class ServerTimingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author')
+        Post.objects.create(author=author, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(REQUEST_TIMING_LOG_THRESHOLD_MS=0)
+    def test_header_and_log_line(self):
+        with self.assertLogs('yatube.timing', 'INFO') as logs:
+            response = self.client.get(reverse('posts:index'))
+        header = response['Server-Timing']
+        for metric in ('db;dur=', 'template;dur=', 'cache;', 'total;dur='):
+            self.assertIn(metric, header)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['url_name'], 'posts:index')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['db_count'], 0)
+        self.assertGreater(record['cache_misses'], 0)
+        # Второй раз страница берётся из кеша.
+        with self.assertLogs('yatube.timing', 'INFO') as logs:
+            self.client.get(reverse('posts:index'))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertGreater(record['cache_hits'], 0)
+        self.assertNotIn('template_ms', record)
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_measured(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(REQUEST_TIMING_HEADER=False)
+    def test_header_is_for_staff_only(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('posts:index'))
+        self.assertIn('Server-Timing', response)
+        # Кеш обёрнут один раз на класс, а не в каждом запросе.
+        self.assertNotIn('get', vars(caches['default']))
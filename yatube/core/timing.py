@@ -0,0 +1,176 @@
+"""Замеры того, на что уходит время запроса.
+
+Metrics копит замеры одного запроса: число и время SQL-запросов,
+время рендеринга шаблонов, попадания и промахи кеша и время работы
+с миниатюрами. Замеры активны только внутри `collect()`; вне его
+span() и обёртки ничего не делают, так что код можно размечать
+без оглядки на то, включены ли замеры.
+"""
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache
+from django.db import connections
+from django.template.backends import django as django_backend
+
+_local = threading.local()
+_MISSING = object()
+
+
+class Metrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_count = 0
+        self.db_ms = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Имя участка (template, thumbnail) -> миллисекунды.
+        self.spans = {}
+
+    def add_span(self, name, milliseconds):
+        self.spans[name] = self.spans.get(name, 0.0) + milliseconds
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def as_dict(self):
+        return {
+            'total_ms': round(self.total_ms(), 2),
+            'db_count': self.db_count,
+            'db_ms': round(self.db_ms, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            **{
+                f'{name}_ms': round(value, 2)
+                for name, value in sorted(self.spans.items())
+            },
+        }
+
+    def server_timing(self):
+        """Значение заголовка Server-Timing."""
+        parts = [
+            f'db;dur={self.db_ms:.1f};desc="{self.db_count} queries"',
+            *(
+                f'{name};dur={value:.1f}'
+                for name, value in sorted(self.spans.items())
+            ),
+            f'cache;desc="{self.cache_hits} hits, '
+            f'{self.cache_misses} misses"',
+            f'total;dur={self.total_ms():.1f}',
+        ]
+        return ', '.join(parts)
+
+
+def current():
+    """Замеры текущего запроса или None, если они не ведутся."""
+    return getattr(_local, 'metrics', None)
+
+
+@contextmanager
+def span(name):
+    """Добавляет время блока к участку `name` текущих замеров."""
+    metrics = current()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_span(name, (time.perf_counter() - started) * 1000)
+
+
+def _query_wrapper(execute, sql, params, many, context):
+    metrics = current()
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if metrics is not None:
+            metrics.db_count += 1
+            metrics.db_ms += (time.perf_counter() - started) * 1000
+
+
+def _timed_get(original_get):
+    def get(self, key, default=None, version=None):
+        value = original_get(self, key, _MISSING, version=version)
+        metrics = current()
+        if value is _MISSING:
+            if metrics is not None:
+                metrics.cache_misses += 1
+            return default
+        if metrics is not None:
+            metrics.cache_hits += 1
+        return value
+
+    get.timed = True
+    return get
+
+
+def _timed_get_many(original_get_many):
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = original_get_many(self, keys, version=version)
+        metrics = current()
+        if metrics is not None:
+            metrics.cache_hits += len(found)
+            metrics.cache_misses += len(keys) - len(found)
+        return found
+
+    get_many.timed = True
+    return get_many
+
+
+def install_cache_timing():
+    """Оборачивает get и get_many бэкендов кешей из CACHES счётчиками
+    попаданий, один раз на процесс."""
+    for alias in settings.CACHES:
+        backend_class = type(caches[alias])
+        if getattr(backend_class.get, 'timed', False):
+            continue
+        # Стандартный get_many сам вызывает get; свой считаем отдельно.
+        if backend_class.get_many is not BaseCache.get_many:
+            backend_class.get_many = _timed_get_many(backend_class.get_many)
+        backend_class.get = _timed_get(backend_class.get)
+
+
+def install_template_timing():
+    """Оборачивает рендеринг шаблонов Django, один раз на процесс.
+
+    Обёрнут шаблон бэкенда, который рендерят render() и
+    TemplateResponse; вложенные include не считаются повторно.
+    """
+    template_class = django_backend.Template
+    if getattr(template_class.render, 'timed', False):
+        return
+    original_render = template_class.render
+
+    def render(self, context=None, request=None):
+        with span('template'):
+            return original_render(self, context, request)
+
+    render.timed = True
+    template_class.render = render
+
+
+@contextmanager
+def collect():
+    """Ведёт замеры для кода внутри блока и отдаёт Metrics.
+
+    Шаблоны и кеш замеряются, если их обёртки уже поставлены
+    install_template_timing() и install_cache_timing().
+    """
+    metrics = Metrics()
+    _local.metrics = metrics
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(_query_wrapper)
+                )
+            yield metrics
+    finally:
+        _local.metrics = None
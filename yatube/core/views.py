@@ -1,5 +1,12 @@
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse
 from django.shortcuts import render
 
+from . import metrics as registry
+from . import slow_queries as slow_query_log
+
 
 def page_not_found(request, exception):
     # Переменная exception содержит отладочную информацию;
@@ -15,4 +22,21 @@ def permission_denied(request, exception):
 
 
 def csrf_failure(request, reason=''):
-    return render(request, 'core/403csrf.html')
\ No newline at end of file
+    return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def metrics(request):
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4'
+    )
+
+
+def slow_queries(request):
+    """Сводка журнала медленных запросов по отпечаткам SQL."""
+    return render(request, 'admin/slow_queries.html', {
+        **admin.site.each_context(request),
+        'title': 'Медленные SQL-запросы',
+        'groups': slow_query_log.aggregate(slow_query_log.read_records()),
+        'threshold': settings.SLOW_QUERY_THRESHOLD_MS,
+    })
@@ -1,9 +1,11 @@
 from django.contrib import admin
 
+from . import search
+from .admin_tools import AutocompleteFilter, ScalableAdminMixin
 from .models import Group, Post
 
 
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'text',
@@ -12,19 +14,34 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
     search_fields = ('text',)
-    list_filter = ('author', 'pub_date',)
+    list_filter = (
+        ('author', AutocompleteFilter),
+        ('group', AutocompleteFilter),
+        'pub_date',
+    )
+    preview_fields = ('text',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Ищем по полнотекстовому индексу, а не LIKE '%term%'.
+        if not search.match_query(search_term):
+            return queryset, False
+        return queryset.filter(
+            pk__in=search.matching_post_ids(search_term)
+        ), False
+
 
-class GroupAdmin(admin.ModelAdmin):
+class GroupAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'title',
-        'description'
+        'description',
     )
     search_fields = ('title',)
-    list_filter = ('title',)
+    preview_fields = ('description',)
     empty_value_display = '-пусто-'
 
 
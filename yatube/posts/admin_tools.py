@@ -0,0 +1,236 @@
+"""Детали админки для таблиц с миллионами строк.
+
+В списке объектов нет полного COUNT(*), фильтры по внешним ключам
+не перечисляют всех связанных объектов, а длинный текст обрезается
+в SQL и не тянется в Python целиком.
+"""
+from django import forms
+from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.admin.widgets import (
+    AutocompleteSelect, RelatedFieldWidgetWrapper,
+)
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор без полного подсчёта строк.
+
+    Для списка без фильтров число строк оценивается по статистике
+    SQLite (sqlite_stat1 после ANALYZE) или по наибольшему id,
+    а отфильтрованный список считается не дальше count_limit.
+    """
+
+    count_limit = 10000
+
+    @cached_property
+    def count(self):
+        # Для подсчёта не нужны ни сортировка, ни вычисляемые колонки.
+        queryset = self.object_list.order_by().values('pk')
+        if not queryset.query.where:
+            estimate = self._estimate(queryset)
+            if estimate > self.count_limit:
+                return estimate
+        return queryset[:self.count_limit + 1].count()
+
+    @staticmethod
+    def _estimate(queryset):
+        model = queryset.model
+        connection = connections[queryset.db]
+        with connection.cursor() as cursor:
+            # Таблица статистики появляется после первого ANALYZE.
+            if 'sqlite_stat1' in connection.introspection.table_names(cursor):
+                cursor.execute(
+                    'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+                    [model._meta.db_table],
+                )
+                row = cursor.fetchone()
+                if row:
+                    return int(row[0].split()[0])
+        return queryset.aggregate(
+            last=Max(model._meta.pk.attname)
+        )['last'] or 0
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """Фильтр по внешнему ключу с полем автодополнения.
+
+    В боковой панели рендерится только выбранный объект, остальные
+    подгружает autocomplete view админки связанной модели, поэтому
+    у неё должны быть заданы search_fields.
+    """
+
+    template = 'admin/posts/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin,
+                 field_path):
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        self.lookup_val = params.get(self.lookup_kwarg)
+        super().__init__(
+            field, request, params, model, model_admin, field_path
+        )
+        self.form_field = forms.ModelChoiceField(
+            queryset=field.remote_field.model._default_manager.all(),
+            widget=AutocompleteSelect(
+                field.remote_field, model_admin.admin_site,
+                attrs={'id': f'autocomplete_filter_{field_path}'},
+            ),
+        )
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.lookup_val is None,
+            'query_string': changelist.get_query_string(
+                remove=[self.lookup_kwarg]
+            ),
+            'display': 'Все',
+        }
+
+    def rendered_widget(self):
+        return self.form_field.widget.render(
+            self.lookup_kwarg, self.lookup_val
+        )
+
+
+class PageAutocompleteSelect(AutocompleteSelect):
+    """Поле автодополнения в строке list_editable.
+
+    Обычный AutocompleteSelect читает выбранный объект отдельным
+    запросом в каждой строке; здесь подписи выбранных объектов всей
+    страницы формсет загружает одним запросом и кладёт в labels.
+    """
+
+    labels = None
+
+    def optgroups(self, name, value, attr=None):
+        selected = [
+            str(item) for item in value
+            if str(item) not in self.choices.field.empty_values
+        ]
+        if self.labels is None or not set(selected) <= self.labels.keys():
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        for item in selected:
+            options.append(self.create_option(
+                name, item, self.labels[item], True, len(options)
+            ))
+        return [(None, options, 0)]
+
+
+def _unwrap(widget):
+    # Виджет внешнего ключа админка оборачивает ссылками
+    # «добавить/изменить».
+    if isinstance(widget, RelatedFieldWidgetWrapper):
+        return widget.widget
+    return widget
+
+
+class PreviewChangeList(ChangeList):
+    """Список объектов, в котором текстовые поля из preview_fields
+    приходят из БД уже обрезанными до preview_length символов."""
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        fields = self.model_admin.preview_fields
+        if not fields:
+            return queryset
+        quote = connections[queryset.db].ops.quote_name
+        table = quote(self.model._meta.db_table)
+        select, params = {}, []
+        for name in fields:
+            field = self.model._meta.get_field(name)
+            column = f'{table}.{quote(field.column)}'
+            select[name] = (
+                f"SUBSTR({column}, 1, %s) || "
+                f"CASE WHEN LENGTH({column}) > %s THEN '…' ELSE '' END"
+            )
+            params += [self.model_admin.preview_length] * 2
+        # Значение из extra() занимает место отложенного поля, поэтому
+        # колонка list_display с именем поля не догружает его из БД.
+        return queryset.defer(*fields).extra(
+            select=select, select_params=params
+        )
+
+
+class ScalableAdminMixin:
+    """Режим админки для больших таблиц.
+
+    preview_fields - текстовые поля, которые в списке показываются
+    обрезанными до preview_length символов средствами SQL.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    preview_fields = ()
+    preview_length = 80
+
+    def get_changelist(self, request, **kwargs):
+        return PreviewChangeList
+
+    def get_changelist_formset(self, request, **kwargs):
+        formset = super().get_changelist_formset(request, **kwargs)
+        page_fields = []
+        for name, field in formset.form.base_fields.items():
+            widget = _unwrap(field.widget)
+            if not isinstance(widget, AutocompleteSelect):
+                continue
+            widget = PageAutocompleteSelect(
+                widget.rel, widget.admin_site, widget.attrs,
+                field.choices, widget.db,
+            )
+            if isinstance(field.widget, RelatedFieldWidgetWrapper):
+                field.widget.widget = widget
+            else:
+                field.widget = widget
+            page_fields.append(name)
+        if not page_fields:
+            return formset
+
+        class PageFormSet(formset):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.page_labels = {
+                    name: self._load_labels(name) for name in page_fields
+                }
+
+            def _load_labels(self, name):
+                field = self.form.base_fields[name]
+                attname = self.model._meta.get_field(name).attname
+                ids = {
+                    getattr(obj, attname) for obj in self.get_queryset()
+                } - {None}
+                return {
+                    str(obj.pk): field.label_from_instance(obj)
+                    for obj in field.queryset.filter(pk__in=ids)
+                }
+
+            def _construct_form(self, i, **kwargs):
+                form = super()._construct_form(i, **kwargs)
+                for name, labels in self.page_labels.items():
+                    _unwrap(form.fields[name].widget).labels = labels
+                return form
+
+        return PageFormSet
+
+    @property
+    def media(self):
+        media = super().media
+        for list_filter in self.list_filter:
+            if isinstance(list_filter, (list, tuple)) and issubclass(
+                list_filter[1], AutocompleteFilter
+            ):
+                # Виджет одинаков для всех фильтров; берём его статику.
+                widget = AutocompleteSelect(None, self.admin_site)
+                return media + widget.media
+        return media
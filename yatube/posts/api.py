@@ -0,0 +1,238 @@
+"""JSON API лент и поста для мобильного клиента (версия 1).
+
+Строки читаются через values() без создания объектов моделей, лента
+листается курсором (`next`/`previous` - готовые ссылки). Каждый ответ
+несёт сильный ETag, так что повторный опрос без изменений получает
+304 после одного запроса и без сериализации. ETag ленты считается по
+строкам самой страницы (ключ, время правки и число комментариев
+поста, соседние курсоры) - та же выборка по индексу ленты, только
+без текстов и JOIN; ETag комментариев - по их числу и последней
+правке.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Count, Max
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import condition, require_safe
+
+from .models import Comment, Group, Post, TimelineEntry, User
+from .paginators import CursorPaginator
+
+API_VERSION = 1
+# Поле ответа -> поле values() для постов.
+POST_FIELDS = {
+    'id': 'pk',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comment_count': 'comment_count',
+}
+POST_ORDERING = ('-pub_date', '-pk')
+# Колонки строк страницы, от которых зависит ответ ленты: новые и
+# удалённые посты меняют ключи, правки - updated, комментарии - счётчик.
+POST_ETAG_FIELDS = ('pk', 'pub_date', 'updated', 'comment_count')
+# То же для записей материализованной ленты подписок.
+TIMELINE_FIELDS = {
+    'id': 'post_id',
+    'text': 'post__text',
+    'pub_date': 'pub_date',
+    'author': 'post__author__username',
+    'group': 'post__group__slug',
+    'image': 'post__image',
+    'comment_count': 'post__comment_count',
+}
+TIMELINE_ORDERING = ('-pub_date', '-post_id')
+TIMELINE_ETAG_FIELDS = (
+    'post_id', 'pub_date', 'post__updated', 'post__comment_count'
+)
+COMMENT_FIELDS = {
+    'id': 'pk',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+def _hash(*parts):
+    raw = '|'.join(map(str, (API_VERSION, *parts)))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def make_etag(queryset, date_field, *extra):
+    """Сильный ETag по самой свежей дате и числу строк queryset."""
+    stats = queryset.order_by().aggregate(
+        newest=Max(date_field), total=Count('pk')
+    )
+    return _hash(*stats.values(), *extra)
+
+
+def get_page(request, queryset, ordering, per_page):
+    """Страница курсорной пагинации по курсору из запроса."""
+    paginator = CursorPaginator(queryset, per_page, ordering=ordering)
+    return paginator.get_page(cursor=request.GET.get('cursor'))
+
+
+def page_etag(request, queryset, fields, ordering, per_page):
+    """Сильный ETag по колонкам fields строк запрошенной страницы."""
+    page = get_page(
+        request, queryset.values(*fields), ordering, per_page
+    )
+    return _hash(
+        page.next_cursor, page.previous_cursor,
+        *(tuple(row.values()) for row in page.object_list),
+    )
+
+
+def serialize(row, fields):
+    record = {name: row[field] for name, field in fields.items()}
+    if 'image' in record:
+        record['image'] = (
+            default_storage.url(record['image']) if record['image'] else None
+        )
+    return record
+
+
+def page_response(request, queryset, fields, ordering, per_page, **extra):
+    """Страница курсорной пагинации по values() в JSON."""
+    page = get_page(
+        request, queryset.values(*fields.values()), ordering, per_page
+    )
+
+    def link(cursor):
+        return f'{request.path}?cursor={cursor}' if cursor else None
+
+    return JsonResponse({
+        **extra,
+        'results': [serialize(row, fields) for row in page.object_list],
+        'next': link(page.next_cursor),
+        'previous': link(page.previous_cursor),
+    }, json_dumps_params=JSON_PARAMS)
+
+
+def feed_response(request, queryset):
+    return page_response(
+        request, queryset, POST_FIELDS, POST_ORDERING,
+        settings.POSTS_QUANTITY,
+    )
+
+
+def api_login_required(view):
+    """Как login_required, но 401 в JSON вместо редиректа."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse(
+                {'detail': 'Нужна авторизация.'}, status=401
+            )
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def _posts_etag(**lookups):
+    def etag(request, **kwargs):
+        return page_etag(
+            request,
+            Post.objects.filter(
+                **{key: kwargs[value] for key, value in lookups.items()}
+            ),
+            POST_ETAG_FIELDS,
+            POST_ORDERING,
+            settings.POSTS_QUANTITY,
+        )
+    return etag
+
+
+@require_safe
+@condition(etag_func=_posts_etag())
+def index(request):
+    return feed_response(request, Post.objects.all())
+
+
+@require_safe
+@condition(etag_func=_posts_etag(group__slug='slug'))
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return feed_response(request, group.posts.all())
+
+
+@require_safe
+@condition(etag_func=_posts_etag(author__username='username'))
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return feed_response(request, author.posts.all())
+
+
+def _follow_etag(request):
+    if not request.user.is_authenticated:
+        return None
+    return page_etag(
+        request,
+        TimelineEntry.objects.filter(user=request.user),
+        TIMELINE_ETAG_FIELDS,
+        TIMELINE_ORDERING,
+        settings.POSTS_QUANTITY,
+    )
+
+
+@require_safe
+@api_login_required
+@condition(etag_func=_follow_etag)
+def follow_index(request):
+    return page_response(
+        request,
+        TimelineEntry.objects.filter(user=request.user),
+        TIMELINE_FIELDS,
+        TIMELINE_ORDERING,
+        settings.POSTS_QUANTITY,
+    )
+
+
+def _comments_etag(request, post_id, *extra):
+    return make_etag(
+        Comment.objects.filter(post_id=post_id), 'updated', post_id, *extra
+    )
+
+
+def _post_etag(request, post_id):
+    # В ответе есть и сам пост: его правки тоже меняют ETag.
+    post = Post.objects.filter(pk=post_id).values_list(
+        'updated', 'comment_count'
+    ).first()
+    return _comments_etag(request, post_id, *(post or ()))
+
+
+def comments_response(request, post_id, **extra):
+    return page_response(
+        request,
+        Comment.objects.filter(post_id=post_id),
+        COMMENT_FIELDS,
+        ('created', 'pk'),
+        settings.COMMENTS_PER_PAGE,
+        **extra,
+    )
+
+
+@require_safe
+@condition(etag_func=_post_etag)
+def post_detail(request, post_id):
+    """Пост и первая страница его комментариев."""
+    post = get_object_or_404(
+        Post.objects.values(*POST_FIELDS.values()), pk=post_id
+    )
+    return comments_response(
+        request, post_id, post=serialize(post, POST_FIELDS)
+    )
+
+
+@require_safe
+@condition(etag_func=_comments_etag)
+def post_comments(request, post_id):
+    """Следующие страницы комментариев поста."""
+    return comments_response(request, post_id)
@@ -0,0 +1,205 @@
+"""Кеш страниц лент с ключами по поколениям.
+
+Каждая лента принадлежит одной или нескольким областям
+(`index`, `group:<slug>`, `profile:<username>`, `follow:<user_id>`)
+и, кроме того, общей области `all`.
+У области есть поколение - случайный токен в кеше. Версия страницы
+строится из поколений её областей, поэтому сигнал, сменивший
+поколение, мгновенно делает устаревшими все страницы области,
+а сами страницы можно хранить долго. Устаревшая копия лежит под тем
+же ключом, пока её не заменит пересчитанная.
+"""
+import hashlib
+import logging
+import math
+import random
+import time
+from functools import wraps
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+
+from .models import Follow, Group
+
+logger = logging.getLogger(__name__)
+
+# Как часто запрос без копии проверяет, не готова ли страница.
+FEED_CACHE_POLL_INTERVAL = 0.05
+
+
+def generation_key(scope):
+    # Слаги и имена бывают не ASCII и с пробелами, а такие ключи
+    # memcached не принимает (CacheKeyWarning).
+    return 'feed-generation:' + hashlib.md5(scope.encode()).hexdigest()
+
+
+def bump(*scopes):
+    """Начинает новое поколение для каждой из областей."""
+    if scopes:
+        cache.set_many(
+            {generation_key(scope): uuid4().hex for scope in scopes},
+            None,
+        )
+
+
+def generations(scopes):
+    keys = [generation_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, uuid4().hex, None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def post_scopes(post, group_ids=()):
+    """Области кеша всех лент, в которых виден пост."""
+    group_ids = {post.group_id, *group_ids} - {None}
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    return [
+        'index',
+        f'profile:{post.author.username}',
+        *(
+            f'group:{slug}' for slug in Group.objects.filter(
+                pk__in=group_ids
+            ).values_list('slug', flat=True)
+        ),
+        *(f'follow:{user_id}' for user_id in set(follower_ids)),
+    ]
+
+
+def page_keys(request, scopes, shared=False):
+    """Ключ копии страницы (без поколений: там лежит и устаревшая
+    копия) и текущая версия страницы (с поколениями её областей).
+
+    Общая (`shared`) копия одна на всех пользователей.
+    """
+    if shared:
+        user = 'shared'
+    else:
+        user = request.user.pk if request.user.is_authenticated else 'anon'
+    base = f'{request.get_full_path()}|{user}'
+    version = '|'.join(generations(['all', *scopes]))
+    return (
+        'feed-page:' + hashlib.md5(base.encode()).hexdigest(),
+        hashlib.md5(version.encode()).hexdigest(),
+    )
+
+
+def _is_fresh(entry, version):
+    """Копия актуальна: та же версия и не выпал ранний пересчёт.
+
+    Вероятностное раннее истечение (XFetch): чем ближе срок и чем
+    дольше страница считалась, тем вероятнее, что один из запросов
+    пересчитает её заранее, а не все разом в момент истечения.
+    """
+    if entry['version'] != version:
+        return False
+    early = (
+        entry['delta'] * settings.FEED_CACHE_EARLY_BETA
+        * -math.log(1 - random.random())
+    )
+    return time.time() + early < entry['expires']
+
+
+def cache_feed(*scope_templates, timeout=None):
+    """Кеширует страницу ленты до смены поколения её областей.
+
+    Шаблоны областей форматируются аргументами view и `user` -
+    id текущего пользователя: `cache_feed('group:{slug}')`.
+    Страницы с CSRF-токеном не кешируются. Под `holes.punch_holes`
+    персональные фрагменты заменены метками, и страница, чьи области
+    не зависят от `user`, хранится одной копией на всех.
+
+    Промахи по одной странице пересчитывает один запрос под
+    блокировкой в кеше (single-flight), а остальные тем временем
+    получают прежнюю копию, если она есть (stale-while-revalidate),
+    или ждут результата. Устаревшая копия хранится ещё
+    FEED_CACHE_STALE_TIMEOUT секунд и отдаётся и тогда, когда
+    пересчёт упал с ошибкой БД (stale-if-error).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            scopes = [
+                template.format(user=request.user.pk, **kwargs)
+                for template in scope_templates
+            ]
+            shared = getattr(request, 'punch_holes', False) and not any(
+                '{user}' in template for template in scope_templates
+            )
+            key, version = page_keys(request, scopes, shared)
+            entry = cache.get(key)
+            if entry is not None and _is_fresh(entry, version):
+                return entry['response']
+            locked, ready = _lock_or_wait(key, version, entry)
+            if ready is not None:
+                return ready['response']
+            try:
+                return _recompute(
+                    key, version, entry, timeout,
+                    view, request, *args, **kwargs,
+                )
+            finally:
+                if locked:
+                    cache.delete(f'{key}:lock')
+        return wrapper
+    return decorator
+
+
+def _lock_or_wait(key, version, entry):
+    """Берёт блокировку пересчёта страницы: (взята ли, готовая копия).
+
+    Без блокировки отдаётся прежняя копия или та, что пересчитал
+    владелец блокировки; если не дождались, страница считается
+    и без неё.
+    """
+    if cache.add(f'{key}:lock', 1, settings.FEED_CACHE_LOCK_TIMEOUT):
+        return True, None
+    if entry is not None:
+        return False, entry
+    return False, _wait_for(key, version)
+
+
+def _recompute(key, version, entry, timeout, view, request, *args,
+               **kwargs):
+    """Считает страницу и кладёт её в кеш; при ошибке БД отдаёт
+    устаревшую копию entry, если она есть."""
+    started = time.time()
+    try:
+        response = view(request, *args, **kwargs)
+    except DatabaseError:
+        if entry is None:
+            raise
+        logger.warning('Отдана устаревшая копия %s', key)
+        return entry['response']
+    if (
+        response.status_code == 200
+        and not response.streaming
+        and not request.META.get('CSRF_COOKIE_USED')
+    ):
+        lifetime = settings.FEED_CACHE_TIMEOUT if timeout is None else timeout
+        cache.set(key, {
+            'version': version,
+            'response': response,
+            'expires': time.time() + lifetime,
+            'delta': time.time() - started,
+        }, lifetime + settings.FEED_CACHE_STALE_TIMEOUT)
+    return response
+
+
+def _wait_for(key, version):
+    """Ждёт, пока страницу пересчитает запрос с блокировкой."""
+    deadline = time.time() + settings.FEED_CACHE_LOCK_TIMEOUT
+    while time.time() < deadline:
+        time.sleep(FEED_CACHE_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None and entry['version'] == version:
+            return entry
+    return None
@@ -0,0 +1,131 @@
+"""Условные GET для HTML-страниц: 304 до рендеринга шаблона.
+
+Состояние страницы - время последнего изменения её постов и
+комментариев (поля `updated`) и поколения её областей кеша
+(posts.caching), которые меняют сигналы при удалениях, подписках и
+готовности миниатюр. Last-Modified берётся из времени, ETag - из
+всего состояния, текущего пользователя (вошедший и анонимный
+пользователи видят разные страницы) и CSRF-cookie: форма комментария
+несёт токен, который после входа или выхода меняется, и 304 оставил
+бы в браузере устаревший.
+"""
+import hashlib
+from calendar import timegm
+from functools import wraps
+
+from django.db import DatabaseError
+from django.db.models import DateTimeField, OuterRef, Subquery
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control
+)
+from django.utils.http import http_date, quote_etag
+
+from . import caching
+from .models import Comment, Post, User
+
+
+def _etag(request, last_modified, parts):
+    user = request.user.pk if request.user.is_authenticated else ''
+    # Секрет из cookie (или сессии) кладёт в META CsrfViewMiddleware;
+    # в ETag он попадает только хешем.
+    csrf = request.META.get('CSRF_COOKIE', '')
+    return quote_etag(hashlib.md5('|'.join(map(
+        str, (user, csrf, last_modified, *parts)
+    )).encode()).hexdigest())
+
+
+def conditional_page(page_state):
+    """Отвечает 304, если состояние страницы не изменилось.
+
+    `page_state(**kwargs)` по аргументам view возвращает
+    (время изменения или None, список частей состояния) либо None,
+    если объекта нет - тогда view сама ответит 404. Если БД
+    недоступна, запрос тоже уходит во view без проверки.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            try:
+                state = page_state(**kwargs)
+            except DatabaseError:
+                # Без БД нечем проверить валидаторы; view под cache_feed
+                # ещё может отдать устаревшую копию (stale-if-error).
+                return view(request, *args, **kwargs)
+            if state is None:
+                return view(request, *args, **kwargs)
+            last_modified, parts = state
+            etag = _etag(request, last_modified, parts)
+            timestamp = (
+                timegm(last_modified.utctimetuple()) if last_modified
+                else None
+            )
+            response = get_conditional_response(
+                request, etag=etag, last_modified=timestamp
+            )
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200:
+                    # Рендеринг формы мог выдать первый CSRF-токен.
+                    response.setdefault(
+                        'ETag', _etag(request, last_modified, parts)
+                    )
+                    if timestamp is not None:
+                        response.setdefault(
+                            'Last-Modified', http_date(timestamp)
+                        )
+            # Без эвристического кеша: браузер всегда переспрашивает.
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
+
+
+def _latest(*dates):
+    dates = [date for date in dates if date is not None]
+    return max(dates) if dates else None
+
+
+def _newest(queryset):
+    # ORDER BY updated DESC LIMIT 1 по индексу (<владелец>, updated)
+    # дешевле MAX() через JOIN.
+    return Subquery(
+        queryset.order_by('-updated').values('updated')[:1],
+        output_field=DateTimeField(),
+    )
+
+
+def post_detail_state(post_id):
+    row = Post.objects.filter(pk=post_id).values(
+        'updated', 'comment_count', 'author__username'
+    ).annotate(
+        comments_updated=_newest(Comment.objects.filter(post=OuterRef('pk')))
+    ).first()
+    if row is None:
+        return None
+    return _latest(row['updated'], row['comments_updated']), [
+        row['comment_count'],
+        *caching.generations(['all', f'profile:{row["author__username"]}']),
+    ]
+
+
+def group_state(slug):
+    latest = Post.objects.filter(group__slug=slug).order_by(
+        '-updated'
+    ).values_list('updated', flat=True).first()
+    return latest, caching.generations(['all', f'group:{slug}'])
+
+
+def profile_state(username):
+    row = User.objects.filter(username=username).values(
+        'stats__follower_count'
+    ).annotate(
+        latest=_newest(Post.objects.filter(author=OuterRef('pk')))
+    ).first()
+    if row is None:
+        return None
+    return row['latest'], [
+        row['stats__follower_count'],
+        *caching.generations(['all', f'profile:{username}']),
+    ]
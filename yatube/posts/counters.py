@@ -0,0 +1,113 @@
+"""Денормализованные счётчики постов, подписок и комментариев.
+
+Сигналы меняют счётчики атомарно через F-выражения, поэтому
+горячие страницы читают готовые числа без COUNT(*).
+Расхождения (bulk_create, ручные правки БД) исправляет
+`reconcile_users`/`reconcile_posts` пачками по первичному ключу.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, TimelineEntry, UserStats
+
+User = get_user_model()
+
+USER_COUNTERS = {
+    'post_count': (Post, 'author'),
+    'follower_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+    'timeline_count': (TimelineEntry, 'user'),
+}
+
+
+def change_user(user_id, field, delta):
+    """Сдвигает счётчик пользователя. Если строки счётчиков ещё
+    нет, при росте создаёт её по реальным данным; уменьшение
+    отсутствующей строки (например, при каскадном удалении
+    пользователя) пропускается."""
+    rows = UserStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        rows = rows.filter(**{f'{field}__gte': -delta})
+    if not rows.update(**{field: F(field) + delta}) and delta > 0:
+        reconcile_users(User.objects.filter(pk=user_id))
+
+
+def change_post(post_id, delta):
+    rows = Post.objects.filter(pk=post_id)
+    if delta < 0:
+        rows = rows.filter(comment_count__gte=-delta)
+    rows.update(comment_count=F('comment_count') + delta)
+
+
+def _count(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def _batches(queryset, batch_size):
+    """Режет queryset на пачки по первичному ключу без OFFSET."""
+    last_pk = 0
+    while True:
+        batch = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk')[:batch_size]
+        )
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1].pk
+
+
+def reconcile_users(queryset=None, batch_size=500):
+    """Пересчитывает счётчики пользователей; возвращает число
+    исправленных строк."""
+    if queryset is None:
+        queryset = User.objects.all()
+    queryset = queryset.annotate(**{
+        field: _count(model, lookup)
+        for field, (model, lookup) in USER_COUNTERS.items()
+    }).select_related('stats')
+    fixed = 0
+    for batch in _batches(queryset, batch_size):
+        missing, drifted = [], []
+        for user in batch:
+            real = {field: getattr(user, field) for field in USER_COUNTERS}
+            stats = getattr(user, 'stats', None)
+            if stats is None:
+                missing.append(UserStats(user=user, **real))
+            elif any(getattr(stats, f) != v for f, v in real.items()):
+                for field, value in real.items():
+                    setattr(stats, field, value)
+                drifted.append(stats)
+        UserStats.objects.bulk_create(missing, ignore_conflicts=True)
+        UserStats.objects.bulk_update(drifted, list(USER_COUNTERS))
+        fixed += len(missing) + len(drifted)
+    return fixed
+
+
+def reconcile_posts(queryset=None, batch_size=500):
+    """Пересчитывает число комментариев у постов."""
+    if queryset is None:
+        queryset = Post.objects.all()
+    queryset = queryset.only('pk', 'comment_count').annotate(
+        real_count=_count(Comment, 'post')
+    )
+    fixed = 0
+    for batch in _batches(queryset, batch_size):
+        drifted = [
+            post for post in batch if post.comment_count != post.real_count
+        ]
+        for post in drifted:
+            post.comment_count = post.real_count
+        Post.objects.bulk_update(drifted, ['comment_count'])
+        fixed += len(drifted)
+    return fixed
@@ -0,0 +1,80 @@
+"""Потоковая выгрузка постов автора или группы в JSONL и CSV.
+
+Строки читаются через values() и iterator(), так что в памяти
+одновременно лежит только одна пачка. Посты идут по возрастанию
+(pub_date, id); выгрузку можно продолжить с места обрыва, передав
+в `after` дату и id последней полученной записи. Формат записей
+совпадает с форматом импорта (posts.importer).
+"""
+import csv
+import json
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+FORMATS = ('jsonl', 'csv')
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+FIELDS = ('type', 'id', 'author', 'group', 'pub_date', 'text')
+IMAGE_FIELDS = FIELDS + ('image',)
+
+
+def parse_after(value):
+    """Позиция `<pub_date ISO>,<id>` -> (datetime, id)."""
+    date, _, pk = value.rpartition(',')
+    pub_date = parse_datetime(date)
+    if pub_date is None or not pk.isdigit():
+        raise ValueError(f'Неверная позиция: {value!r}')
+    if timezone.is_naive(pub_date):
+        pub_date = timezone.make_aware(pub_date, timezone.utc)
+    return pub_date, int(pk)
+
+
+def post_records(queryset, after=None, images=False, chunk_size=2000):
+    """Записи постов queryset по возрастанию (pub_date, id)."""
+    queryset = queryset.order_by('pub_date', 'pk')
+    if after is not None:
+        pub_date, pk = after
+        queryset = queryset.filter(
+            Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+        )
+    rows = queryset.values(
+        'pk', 'pub_date', 'text', 'image', 'author__username', 'group__slug'
+    )
+    for row in rows.iterator(chunk_size=chunk_size):
+        record = {
+            'type': 'post',
+            'id': row['pk'],
+            'author': row['author__username'],
+            'group': row['group__slug'],
+            'pub_date': row['pub_date'].isoformat(),
+            'text': row['text'],
+        }
+        if images:
+            record['image'] = row['image']
+        yield record
+
+
+class _Echo:
+    """Файл для csv.writer, который просто возвращает строку."""
+
+    def write(self, value):
+        return value
+
+
+def render(records, data_format, images=False):
+    """Строки файла выгрузки для StreamingHttpResponse или stdout."""
+    if data_format == 'jsonl':
+        for record in records:
+            yield json.dumps(record, ensure_ascii=False) + '\n'
+    elif data_format == 'csv':
+        fields = IMAGE_FIELDS if images else FIELDS
+        writer = csv.DictWriter(_Echo(), fields)
+        yield writer.writeheader()
+        for record in records:
+            yield writer.writerow(record)
+    else:
+        raise ValueError(f'Неизвестный формат: {data_format}')
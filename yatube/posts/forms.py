@@ -1,6 +1,8 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 from django.utils.translation import gettext_lazy as _
 
+from .images import prepare_upload
 from .models import Comment, Post
 
 
@@ -17,6 +19,12 @@ class PostForm(forms.ModelForm):
             'group': _('Группа, к которой будет относиться пост'),
         }
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            return prepare_upload(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,132 @@
+"""Персональные фрагменты общих закешированных страниц.
+
+Лента одна для всех, а шапка с именем пользователя, вкладки подписок
+и кнопка «Подписаться» у каждого свои. Декоратор `punch_holes`
+рендерит страницу с метками `<!--hole:...-->` на месте таких
+фрагментов (тег `{% hole %}`), и тело страницы кешируется один раз
+для всех пользователей. Метки заполняются на каждом запросе из
+маленького кеша фрагментов конкретного пользователя; его версия -
+поколение области `user:<id>` (posts.caching). Фрагменты с
+CSRF-токеном привязаны к сессии и рендерятся заново каждый раз.
+
+Вне `punch_holes` тег сразу рендерит фрагмент, так что те же шаблоны
+работают и на некешируемых страницах.
+"""
+import hashlib
+import re
+from functools import wraps
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import caching
+from .models import Follow
+
+HOLE = re.compile(r'<!--hole:([\w.:-]+)-->')
+SIGNING_SALT = 'posts.holes'
+# Имя фрагмента -> (шаблон, функция контекста).
+FRAGMENTS = {}
+
+
+def fragment(template):
+    """Регистрирует фрагмент; функция получает request и аргументы
+    тега и возвращает контекст шаблона."""
+    def decorator(func):
+        FRAGMENTS[func.__name__] = (template, func)
+        return func
+    return decorator
+
+
+@fragment('includes/header_user.html')
+def header(request):
+    return {}
+
+
+@fragment('posts/includes/switcher.html')
+def switcher(request):
+    return {}
+
+
+@fragment('posts/includes/follow_button.html')
+def follow_button(request, author):
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user, author__username=author
+    ).exists()
+    return {'author': author, 'following': following}
+
+
+def punch(request, name, kwargs):
+    """Метка фрагмента при общем рендеринге, иначе сам фрагмент."""
+    if getattr(request, 'punch_holes', False):
+        payload = signing.dumps([name, kwargs], salt=SIGNING_SALT)
+        return mark_safe(f'<!--hole:{payload}-->')
+    return mark_safe(render_fragments(request, [(name, kwargs)])[0])
+
+
+def render_fragments(request, specs):
+    """HTML фрагментов [(имя, аргументы)] для текущего пользователя."""
+    user = request.user.pk if request.user.is_authenticated else 'anon'
+    version = '|'.join(caching.generations(['all', f'user:{user}']))
+    keys = [
+        'fragment:' + hashlib.md5(
+            f'{name}|{sorted(kwargs.items())}|{user}|{version}'.encode()
+        ).hexdigest()
+        for name, kwargs in specs
+    ]
+    found = cache.get_many(keys)
+    fresh = {}
+    for key, (name, kwargs) in zip(keys, specs):
+        if key in found:
+            continue
+        template, get_context = FRAGMENTS[name]
+        # Флаг выставит get_token(), если фрагмент выведет токен.
+        csrf_used = request.META.pop('CSRF_COOKIE_USED', False)
+        found[key] = render_to_string(
+            template, get_context(request, **kwargs), request=request
+        )
+        if not request.META.get('CSRF_COOKIE_USED'):
+            fresh[key] = found[key]
+        if csrf_used:
+            request.META['CSRF_COOKIE_USED'] = True
+    if fresh:
+        cache.set_many(fresh, settings.FRAGMENT_CACHE_TIMEOUT)
+    return [found[key] for key in keys]
+
+
+def fill(request, response):
+    """Подставляет в ответ фрагменты текущего пользователя."""
+    content = response.content.decode(response.charset)
+    specs = [
+        signing.loads(payload, salt=SIGNING_SALT)
+        for payload in HOLE.findall(content)
+    ]
+    if not specs:
+        return response
+    rendered = iter(render_fragments(request, specs))
+    response.content = HOLE.sub(lambda match: next(rendered), content)
+    return response
+
+
+def punch_holes(view):
+    """Рендерит view с метками вместо персональных фрагментов
+    и заполняет их для текущего пользователя.
+
+    Ставится над `cache_feed`: страницу с метками тот хранит одной
+    копией на всех пользователей.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+        request.punch_holes = True
+        try:
+            response = view(request, *args, **kwargs)
+        finally:
+            request.punch_holes = False
+        if response.streaming or response.status_code != 200:
+            return response
+        return fill(request, response)
+    return wrapper
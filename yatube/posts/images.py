@@ -0,0 +1,89 @@
+"""Приём картинок постов с ограниченным расходом памяти.
+
+Загрузки пишутся на диск (см. FILE_UPLOAD_HANDLERS), размеры и
+формат проверяются по заголовку без полного декодирования, а в
+хранилище попадает мастер-копия не больше POST_IMAGE_MAX_SIDE
+по большей стороне и без EXIF.
+"""
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+ALLOWED_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
+
+def _check_header(image, size):
+    if size > settings.POST_IMAGE_MAX_BYTES:
+        raise ValidationError(
+            'Файл больше %(limit)s.',
+            code='file_too_large',
+            params={'limit': filesizeformat(settings.POST_IMAGE_MAX_BYTES)},
+        )
+    if image.format not in ALLOWED_FORMATS:
+        raise ValidationError(
+            'Поддерживаются только JPEG, PNG, GIF и WebP.',
+            code='invalid_format',
+        )
+    width, height = image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Слишком большое разрешение: %(width)s×%(height)s.',
+            code='too_many_pixels',
+            params={'width': width, 'height': height},
+        )
+
+
+def _save_options(image, image_format, icc_profile):
+    options = {'format': image_format}
+    if image_format == 'JPEG':
+        options.update(quality=90, optimize=True, progressive=True)
+    if icc_profile:
+        options['icc_profile'] = icc_profile
+    if 'transparency' in image.info:
+        options['transparency'] = image.info['transparency']
+    return options
+
+
+def prepare_upload(uploaded):
+    """Проверяет загруженную картинку и возвращает мастер-копию
+    во временном файле на диске."""
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    uploaded.seek(0)
+    with Image.open(uploaded) as source:
+        _check_header(source, uploaded.size)
+        image_format = source.format
+        if getattr(source, 'is_animated', False):
+            # Анимацию не перекодируем, только ограничиваем размер.
+            if max(source.size) > max_side:
+                raise ValidationError(
+                    'Анимация больше %(side)s пикселей по стороне.',
+                    code='animation_too_large',
+                    params={'side': max_side},
+                )
+            uploaded.seek(0)
+            return uploaded
+        # JPEG декодируется сразу в уменьшенном масштабе.
+        source.draft(source.mode, (max_side, max_side))
+        icc_profile = source.info.get('icc_profile')
+        image = ImageOps.exif_transpose(source)
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    # Метаданные (EXIF, XMP, текстовые чанки PNG) не переносим.
+    image.info = {
+        key: value for key, value in image.info.items()
+        if key == 'transparency'
+    }
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L', 'CMYK'):
+        image = image.convert('RGB')
+    master = UploadedFile(
+        tempfile.TemporaryFile(dir=settings.FILE_UPLOAD_TEMP_DIR),
+        uploaded.name,
+        uploaded.content_type,
+    )
+    image.save(master, **_save_options(image, image_format, icc_profile))
+    master.size = master.tell()
+    master.seek(0)
+    return master
@@ -0,0 +1,403 @@
+"""Потоковый импорт пользователей, групп, постов, комментариев и подписок.
+
+Записи читаются из JSONL или CSV по одной и копятся в пачки, которые
+вставляются через bulk_create, каждая в своей транзакции. Поле `type`
+записи - одно из RECORD_TYPES, ссылки на другие объекты - по внешним
+ключам источника: `author`/`user` - username, `group` - slug группы,
+`post` у комментария - поле `id` импортированного ранее поста.
+В памяти живёт только текущая пачка: id источника у постов и то, что
+пересчитать в конце, копятся во временных таблицах соединения, а
+ссылки каждой пачки разрешаются запросом к БД.
+
+bulk_create не шлёт сигналов, поэтому ленты, счётчики и кеш
+пересчитываются один раз в конце импорта - и при ошибке, для пачек,
+которые успели записаться. Поисковый индекс ведут триггеры SQLite;
+с pause_search они на время импорта снимаются для всего сайта (новые
+посты и комментарии сайта не находятся поиском до конца импорта), а
+в конце индекс строится заново одним проходом.
+"""
+import csv
+import json
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import caching, counters, search, timeline
+from .models import Comment, Follow, Group, Post, ThumbnailJob, User
+
+RECORD_TYPES = ('user', 'group', 'post', 'comment', 'follow')
+FORMATS = ('jsonl', 'csv')
+# Временные таблицы импорта: видны только его соединению и пропадают
+# вместе с ним. В import_touched - кого пересчитать в конце: user -
+# счётчики пользователя, post - число комментариев, author - ленты
+# подписчиков, follower - ленту самого пользователя.
+SCRATCH_TABLES = {
+    'import_post': (
+        'source TEXT PRIMARY KEY, post_id INTEGER NOT NULL'
+    ),
+    'import_touched': (
+        'kind TEXT NOT NULL, object_id INTEGER NOT NULL, '
+        'PRIMARY KEY (kind, object_id)'
+    ),
+}
+
+
+class ImportRecordError(ValueError):
+    pass
+
+
+def read_records(stream, data_format):
+    """Итератор записей файла; CSV - с колонкой type и пустыми
+    ячейками для отсутствующих полей."""
+    if data_format == 'jsonl':
+        for line_number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as error:
+                raise ImportRecordError(
+                    f'Строка {line_number}: {error}'
+                ) from error
+    elif data_format == 'csv':
+        for row in csv.DictReader(stream):
+            yield {key: value for key, value in row.items() if value}
+    else:
+        raise ImportRecordError(f'Неизвестный формат: {data_format}')
+
+
+def _chunks(ids, size=500):
+    ids = sorted(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+@contextmanager
+def _scratch_tables():
+    with connection.cursor() as cursor:
+        for name, columns in SCRATCH_TABLES.items():
+            cursor.execute(f'DROP TABLE IF EXISTS temp.{name}')
+            cursor.execute(
+                f'CREATE TEMP TABLE {name} ({columns}) WITHOUT ROWID'
+            )
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for name in SCRATCH_TABLES:
+                cursor.execute(f'DROP TABLE IF EXISTS temp.{name}')
+
+
+def _touch(kind, ids):
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT OR IGNORE INTO import_touched (kind, object_id) '
+            'VALUES (%s, %s)',
+            [(kind, object_id) for object_id in set(ids)],
+        )
+
+
+def _touched(kind, size=500):
+    """Пачки id из import_touched по возрастанию, без OFFSET."""
+    last = 0
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT object_id FROM import_touched '
+                'WHERE kind = %s AND object_id > %s '
+                'ORDER BY object_id LIMIT %s',
+                [kind, last, size],
+            )
+            chunk = [object_id for object_id, in cursor.fetchall()]
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1]
+
+
+def _lock_for_write():
+    """Берёт блокировку записи SQLite в начале транзакции пачки.
+
+    transaction.atomic() открывает транзакцию DEFERRED, и чтение
+    MAX(id) в ней берёт только SHARED-блокировку: другое соединение
+    может записать раньше нашей вставки. Пустой UPDATE первой
+    инструкцией транзакции сразу берёт RESERVED, как BEGIN IMMEDIATE,
+    которого atomic() в Django 2.2 не умеет.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {Post._meta.db_table} SET id = id WHERE 0'
+        )
+
+
+def _keep_dates(model, objs, field, dates):
+    """Возвращает объектам даты источника.
+
+    bulk_create ставит now() в поле с auto_now_add, а выключать его
+    у общего на все потоки поля модели нельзя; поэтому даты
+    дописываются вторым запросом, bulk_update их не трогает.
+    """
+    dated = []
+    for obj, date in zip(objs, dates):
+        if date is not None:
+            setattr(obj, field, date)
+            dated.append(obj)
+    model.objects.bulk_update(dated, [field])
+
+
+class Importer:
+    """Копит записи по типам и сбрасывает их в БД пачками."""
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.buffers = {kind: [] for kind in RECORD_TYPES}
+        self.buffered = 0
+        # Внешний ключ -> id для ссылок текущей пачки.
+        self.users = {}
+        self.groups = {}
+        self.posts = {}
+        self.stats = Counter()
+
+    def add(self, record):
+        kind = record.get('type')
+        if kind not in self.buffers:
+            raise ImportRecordError(f'Неизвестный тип записи: {kind!r}')
+        self.buffers[kind].append(record)
+        self.buffered += 1
+        if self.buffered >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        self.users, self.groups, self.posts = {}, {}, {}
+        # Порядок типов гарантирует, что ссылки пачки уже в БД.
+        with transaction.atomic():
+            _lock_for_write()
+            for kind in RECORD_TYPES:
+                records, self.buffers[kind] = self.buffers[kind], []
+                if records:
+                    getattr(self, f'_load_{kind}s')(records)
+        self.buffered = 0
+
+    @staticmethod
+    def _reserve_ids(model, count):
+        # В SQLite bulk_create не возвращает id, поэтому они
+        # назначаются заранее, начиная с MAX(id) + 1. MAX читается
+        # заново в транзакции каждой пачки, которая уже держит
+        # блокировку записи (_lock_for_write): строки, вставленные
+        # сайтом между пачками, учтены, а внутри пачки другие
+        # соединения ждут её COMMIT.
+        if not count:
+            return iter(())
+        last = model.objects.aggregate(last=Max('pk'))['last'] or 0
+        return iter(range(last + 1, last + 1 + count))
+
+    @staticmethod
+    def _resolve(mapping, model, field, keys):
+        missing = {key for key in keys if key and key not in mapping}
+        for chunk in _chunks(missing):
+            mapping.update(
+                model.objects.filter(**{f'{field}__in': chunk})
+                .values_list(field, 'pk')
+            )
+
+    def _skip(self, kind, count=1):
+        self.stats[f'{kind}_skipped'] += count
+
+    def _load_users(self, records):
+        total = len(records)
+        records = {r['username']: r for r in records if r.get('username')}
+        self._resolve(self.users, User, 'username', records)
+        new = [r for name, r in records.items() if name not in self.users]
+        ids = self._reserve_ids(User, len(new))
+        users = [
+            User(
+                pk=next(ids),
+                username=record['username'],
+                first_name=record.get('first_name', ''),
+                last_name=record.get('last_name', ''),
+                email=record.get('email', ''),
+                password=make_password(None),
+            )
+            for record in new
+        ]
+        User.objects.bulk_create(users)
+        self.users.update((user.username, user.pk) for user in users)
+        _touch('user', (user.pk for user in users))
+        self.stats['user'] += len(users)
+        self._skip('user', total - len(users))
+
+    def _load_groups(self, records):
+        total = len(records)
+        records = {r['slug']: r for r in records if r.get('slug')}
+        self._resolve(self.groups, Group, 'slug', records)
+        new = [r for slug, r in records.items() if slug not in self.groups]
+        ids = self._reserve_ids(Group, len(new))
+        groups = [
+            Group(
+                pk=next(ids),
+                slug=record['slug'],
+                title=record.get('title', record['slug']),
+                description=record.get('description', ''),
+            )
+            for record in new
+        ]
+        Group.objects.bulk_create(groups)
+        self.groups.update((group.slug, group.pk) for group in groups)
+        self.stats['group'] += len(groups)
+        self._skip('group', total - len(groups))
+
+    def _load_posts(self, records):
+        self._resolve(
+            self.users, User, 'username', (r.get('author') for r in records)
+        )
+        self._resolve(
+            self.groups, Group, 'slug', (r.get('group') for r in records)
+        )
+        loadable = [r for r in records if r.get('author') in self.users]
+        ids = self._reserve_ids(Post, len(loadable))
+        posts, sources = [], []
+        for record in loadable:
+            post = Post(
+                pk=next(ids),
+                author_id=self.users[record['author']],
+                group_id=self.groups.get(record.get('group')),
+                text=record.get('text', ''),
+                image=record.get('image', ''),
+            )
+            if 'id' in record:
+                sources.append((str(record['id']), post.pk))
+            posts.append(post)
+        Post.objects.bulk_create(posts)
+        _keep_dates(Post, posts, 'pub_date', (
+            _parse_date(record.get('pub_date')) for record in loadable
+        ))
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                'INSERT OR REPLACE INTO import_post (source, post_id) '
+                'VALUES (%s, %s)',
+                sources,
+            )
+        ThumbnailJob.objects.bulk_create(
+            [ThumbnailJob(post_id=post.pk) for post in posts if post.image],
+            ignore_conflicts=True,
+        )
+        authors = {post.author_id for post in posts}
+        _touch('user', authors)
+        _touch('author', authors)
+        self.stats['post'] += len(posts)
+        self._skip('post', len(records) - len(posts))
+
+    def _resolve_posts(self, sources):
+        missing = {key for key in sources if key not in self.posts}
+        with connection.cursor() as cursor:
+            for chunk in _chunks(missing):
+                cursor.execute(
+                    'SELECT source, post_id FROM import_post WHERE source '
+                    f'IN ({", ".join(["%s"] * len(chunk))})',
+                    chunk,
+                )
+                self.posts.update(cursor.fetchall())
+
+    def _load_comments(self, records):
+        self._resolve(
+            self.users, User, 'username', (r.get('author') for r in records)
+        )
+        self._resolve_posts(str(r.get('post')) for r in records)
+        loadable = [
+            record for record in records
+            if str(record.get('post')) in self.posts
+            and record.get('author') in self.users
+        ]
+        ids = self._reserve_ids(Comment, len(loadable))
+        comments = [
+            Comment(
+                pk=next(ids),
+                post_id=self.posts[str(record['post'])],
+                author_id=self.users[record['author']],
+                text=record.get('text', ''),
+            )
+            for record in loadable
+        ]
+        Comment.objects.bulk_create(comments)
+        _keep_dates(Comment, comments, 'created', (
+            _parse_date(record.get('created')) for record in loadable
+        ))
+        _touch('post', (comment.post_id for comment in comments))
+        self.stats['comment'] += len(comments)
+        self._skip('comment', len(records) - len(comments))
+
+    def _load_follows(self, records):
+        self._resolve(
+            self.users, User, 'username',
+            (r.get(key) for r in records for key in ('user', 'author')),
+        )
+        pairs = {
+            (self.users[record['user']], self.users[record['author']])
+            for record in records
+            if record.get('user') in self.users
+            and record.get('author') in self.users
+            and record['user'] != record['author']
+        }
+        # Существующие подписки пропускает уникальный индекс.
+        Follow.objects.bulk_create(
+            [Follow(user_id=user, author_id=author) for user, author in pairs],
+            ignore_conflicts=True,
+        )
+        _touch('user', (user for pair in pairs for user in pair))
+        _touch('follower', (user for user, _ in pairs))
+        self.stats['follow'] += len(pairs)
+        self._skip('follow', len(records) - len(pairs))
+
+    def rebuild(self):
+        """Пересчитывает всё, что обычно поддерживают сигналы."""
+        for chunk in _touched('user'):
+            counters.reconcile_users(User.objects.filter(pk__in=chunk))
+        for chunk in _touched('post'):
+            counters.reconcile_posts(Post.objects.filter(pk__in=chunk))
+        # Ленту пересобирают и новые подписчики, и подписчики авторов
+        # новых постов.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT OR IGNORE INTO import_touched (kind, object_id) '
+                f'SELECT %s, user_id FROM {Follow._meta.db_table} '
+                'WHERE author_id IN '
+                '(SELECT object_id FROM import_touched WHERE kind = %s)',
+                ['follower', 'author'],
+            )
+        for chunk in _touched('follower'):
+            timeline.rebuild(chunk)
+        caching.bump('all')
+
+
+def _parse_date(value):
+    if not value:
+        return None
+    date = parse_datetime(value)
+    if date is None:
+        raise ImportRecordError(f'Неверная дата: {value!r}')
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date, timezone.utc)
+    return date
+
+
+def run(records, batch_size=1000, pause_search=False):
+    """Импортирует записи итератора; возвращает Counter с числом
+    созданных (`post`) и пропущенных (`post_skipped`) объектов.
+    pause_search снимает поисковые триггеры на время импорта."""
+    importer = Importer(batch_size)
+    indexing = search.paused() if pause_search else nullcontext()
+    with _scratch_tables():
+        try:
+            with indexing:
+                for record in records:
+                    importer.add(record)
+                importer.flush()
+        finally:
+            # Откаченная пачка не оставляет следов и в import_touched.
+            importer.rebuild()
+    return importer.stats
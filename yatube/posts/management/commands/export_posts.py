@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import exporter
+from posts.models import Group, Post, User
+
+
+class Command(BaseCommand):
+    help = 'Потоково выгружает посты автора или группы в JSONL или CSV.'
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument('--author', help='Username автора.')
+        source.add_argument('--group', help='Slug группы.')
+        parser.add_argument(
+            '--format',
+            choices=exporter.FORMATS,
+            default='jsonl',
+        )
+        parser.add_argument(
+            '--after',
+            help='Продолжить после записи "<pub_date>,<id>".',
+        )
+        parser.add_argument(
+            '--images',
+            action='store_true',
+            help='Добавить пути файлов картинок.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Сколько строк читать из БД за один раз.',
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл выгрузки (по умолчанию stdout).',
+        )
+
+    def handle(self, *args, **options):
+        if options['author']:
+            if not User.objects.filter(username=options['author']).exists():
+                raise CommandError('Нет такого автора.')
+            queryset = Post.objects.filter(
+                author__username=options['author']
+            )
+        else:
+            if not Group.objects.filter(slug=options['group']).exists():
+                raise CommandError('Нет такой группы.')
+            queryset = Post.objects.filter(group__slug=options['group'])
+        try:
+            after = (
+                exporter.parse_after(options['after'])
+                if options['after'] else None
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        lines = exporter.render(
+            exporter.post_records(
+                queryset, after, options['images'], options['chunk_size']
+            ),
+            options['format'],
+            options['images'],
+        )
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8',
+                  newline='') as output:
+            output.writelines(lines)
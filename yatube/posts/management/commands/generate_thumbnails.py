@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = ('Заранее создаёт миниатюры всех геометрий для картинок '
+            'существующих постов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=None,
+            help='Размер пула процессов (по умолчанию - число ядер).',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=50,
+            help='Сколько картинок отдавать процессу за раз.',
+        )
+
+    def handle(self, *args, **options):
+        created = thumbnails.generate_all(
+            processes=options['processes'],
+            chunk_size=options['chunk_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Миниатюр: {created}'))
@@ -0,0 +1,67 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import importer
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково импортирует пользователей, группы, посты, комментарии '
+        'и подписки из JSONL или CSV.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='Файл с записями; "-" - читать из stdin.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=importer.FORMATS,
+            help='Формат файла (по умолчанию - по расширению).',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько записей вставлять в одной транзакции.',
+        )
+        parser.add_argument(
+            '--pause-search',
+            action='store_true',
+            help='Снять поисковые триггеры на время импорта и построить '
+                 'индекс в конце одним проходом. Быстрее для больших '
+                 'файлов, но до конца импорта поиск на всём сайте не '
+                 'находит новые посты и комментарии.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        data_format = options['format'] or (
+            os.path.splitext(path)[1].lstrip('.').lower()
+        )
+        if data_format not in importer.FORMATS:
+            raise CommandError('Укажите формат: --format jsonl или csv.')
+        if path == '-':
+            stream = sys.stdin
+        else:
+            stream = open(path, encoding='utf-8', newline='')
+        try:
+            stats = importer.run(
+                importer.read_records(stream, data_format),
+                batch_size=options['batch_size'],
+                pause_search=options['pause_search'],
+            )
+        except importer.ImportRecordError as error:
+            raise CommandError(error)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        for kind in importer.RECORD_TYPES:
+            self.stdout.write(
+                f'{kind}: создано {stats[kind]}, '
+                f'пропущено {stats[kind + "_skipped"]}'
+            )
+        self.stdout.write(self.style.SUCCESS('Импорт завершён'))
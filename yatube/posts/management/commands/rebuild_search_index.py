@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Заново индексирует тексты постов и комментариев для поиска.'
+
+    def handle(self, *args, **options):
+        search.install()
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен'))
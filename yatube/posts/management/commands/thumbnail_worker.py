@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Воркер очереди миниатюр для новых и изменённых картинок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Разобрать очередь и выйти.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20,
+            help='Сколько заданий забирать за раз.',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1.0,
+            help='Пауза в секундах, когда очередь пуста.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            done = thumbnails.process_queue(options['batch_size'])
+            if done:
+                self.stdout.write(f'Обработано заданий: {done}')
+                continue
+            if options['once']:
+                return
+            time.sleep(options['sleep'])
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def backfill_timelines(apps, schema_editor):
+    """Заполняет ленты подписок по уже существующим подпискам: без
+    этого follow_index пуст, пока не запустят rebuild_timelines."""
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    db_alias = schema_editor.connection.alias
+    filled = TimelineEntry.objects.using(db_alias).values('user_id')
+    user_ids = (
+        Follow.objects.using(db_alias).exclude(user_id__in=filled)
+        .values_list('user_id', flat=True).distinct().iterator()
+    )
+    for user_id in user_ids:
+        posts = (
+            Post.objects.using(db_alias)
+            .filter(author__following__user_id=user_id)
+            .order_by('-pub_date', '-pk')
+            .values_list('pk', 'author_id', 'pub_date')
+            .distinct()[:settings.TIMELINE_LENGTH]
+        )
+        entries = [
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for post_id, author_id, pub_date in posts
+        ]
+        TimelineEntry.objects.using(db_alias).bulk_create(
+            entries,
+            batch_size=schema_editor.connection.ops.bulk_batch_size(
+                TimelineEntry._meta.concrete_fields, entries
+            ),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_updated'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            backfill_timelines, migrations.RunPython.noop, elidable=True
+        ),
+    ]
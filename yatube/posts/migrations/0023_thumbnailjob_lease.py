@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2026-10-18 13:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_backfill_timelines'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thumbnailjob',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Попыток'),
+        ),
+        migrations.AddField(
+            model_name='thumbnailjob',
+            name='locked_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Занято воркером до'),
+        ),
+    ]
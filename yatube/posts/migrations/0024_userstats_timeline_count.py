@@ -0,0 +1,38 @@
+# Generated by Django 2.2.16 on 2026-10-18 13:21
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_timeline_counts(apps, schema_editor):
+    """Записывает длину уже собранных лент."""
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    UserStats = apps.get_model('posts', 'UserStats')
+    db_alias = schema_editor.connection.alias
+    counts = (
+        TimelineEntry.objects.using(db_alias)
+        .filter(user_id=OuterRef('user_id')).order_by()
+        .values('user_id').annotate(total=Count('pk')).values('total')
+    )
+    UserStats.objects.using(db_alias).update(timeline_count=Coalesce(
+        Subquery(counts, output_field=IntegerField()), 0
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0023_thumbnailjob_lease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='timeline_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Записей в ленте'),
+        ),
+        migrations.RunPython(
+            fill_timeline_counts, migrations.RunPython.noop, elidable=True
+        ),
+    ]
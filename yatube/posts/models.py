@@ -35,12 +35,41 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comment_count = models.PositiveIntegerField(
+        'Комментариев',
+        default=0,
+        editable=False,
+    )
+    # Время последнего сохранения: по нему страницы отвечают 304.
+    updated = models.DateTimeField('Изменён', auto_now=True)
 
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx',
+            ),
+            models.Index(
+                fields=['author', 'updated'],
+                name='post_author_updated_idx',
+            ),
+            models.Index(
+                fields=['group', 'updated'],
+                name='post_group_updated_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:settings.TEXT_LIMIT]
@@ -72,13 +101,28 @@ class Comment(models.Model):
         auto_now_add=True,
         verbose_name='Дата',
     )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Изменён',
+    )
 
 
     class Meta:
-        # ordering = ['-pub_date']
+        # Курсор страниц комментариев идёт по (created, id).
+        ordering = ('created', 'id')
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         # db_table = 'posts_comment'
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx',
+            ),
+            models.Index(
+                fields=['post', 'updated'],
+                name='comment_post_updated_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:settings.TEXT_LIMIT]
@@ -104,6 +148,107 @@ class Follow(models.Model):
     class Meta:
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='follow_unique_user_author',
+            ),
+        ]
+
+    def __str__(self):
+        return self.user
+
+
+class TimelineEntry(models.Model):
+    """Материализованная лента подписок: запись на каждый пост
+    автора, на которого подписан пользователь."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор поста',
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx',
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='timeline_user_author_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user} <- {self.post}'
+
+
+class UserStats(models.Model):
+    """Денормализованные счётчики пользователя; их поддерживают
+    сигналы, а команда reconcile_counters исправляет расхождения."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь',
+    )
+    post_count = models.PositiveIntegerField('Постов', default=0)
+    follower_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+    timeline_count = models.PositiveIntegerField(
+        'Записей в ленте', default=0
+    )
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+    def __str__(self):
+        return f'{self.user}'
+
+
+class ThumbnailJob(models.Model):
+    """Очередь генерации миниатюр картинки поста.
+
+    Воркер берёт задание в аренду до `locked_until` и удаляет его только
+    после удачной генерации; задание упавшего воркера или неудачной
+    генерации снова берётся после конца аренды, пока попыток меньше
+    THUMBNAIL_JOB_MAX_ATTEMPTS.
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='thumbnail_job',
+        verbose_name='Пост',
+    )
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    locked_until = models.DateTimeField(
+        'Занято воркером до', null=True, blank=True
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+
+    class Meta:
+        verbose_name = 'Задание на миниатюры'
+        verbose_name_plural = 'Задания на миниатюры'
 
     def __str__(self):
-        return self.user
\ No newline at end of file
+        return f'{self.post_id}'
@@ -0,0 +1,148 @@
+import base64
+import binascii
+from math import ceil
+
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def encode_cursor(direction, number, position):
+    """Упаковывает позицию (дата, id) в непрозрачный токен для URL."""
+    value, pk = position
+    raw = f'{direction}|{number}|{value.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен; для испорченного токена возвращает None."""
+    try:
+        raw = base64.urlsafe_b64decode(
+            token + '=' * (-len(token) % 4)
+        ).decode()
+        direction, number, value, pk = raw.split('|')
+        value = parse_datetime(value)
+        number, pk = int(number), int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or value is None or number < 1:
+        return None
+    return direction, number, (value, pk)
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинатор: страницы выбираются поиском по индексу
+    по паре полей `ordering` без COUNT(*) и растущего OFFSET.
+
+    Первое поле ключа должно быть датой, второе - уникальным (pk).
+    Номер страницы `?page=N` поддерживается для совместимости со
+    старыми ссылками и работает через OFFSET.
+    """
+
+    ordering = ('-pub_date', '-pk')
+    window = 2
+
+    def __init__(self, object_list, per_page, ordering=None, window=None):
+        if ordering is not None:
+            self.ordering = ordering
+        if window is not None:
+            self.window = window
+        super().__init__(object_list.order_by(*self.ordering), per_page)
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        self.descending = self.ordering[0].startswith('-')
+        self._number = 1
+        self._length = 0
+        self._has_next = False
+
+    @property
+    def count(self):
+        """Нижняя оценка числа объектов по уже прочитанным страницам."""
+        return (
+            (self._number - 1) * self.per_page
+            + self._length
+            + int(self._has_next)
+        )
+
+    @property
+    def num_pages(self):
+        return self._number + int(self._has_next)
+
+    def get_page(self, number=None, cursor=None):
+        """Страница по курсору, а без него - по номеру `?page=N`."""
+        position = decode_cursor(cursor) if cursor else None
+        if position is None:
+            return self.page_by_number(number)
+        direction, number, values = position
+        if direction == NEXT:
+            return self._page_after(values, number)
+        return self._page_before(values, number)
+
+    def page_by_number(self, number):
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        rows = self._slice(number)
+        if not rows and number > 1:
+            # Как Paginator.get_page: за концом ленты - последняя страница.
+            number = max(ceil(self.object_list.count() / self.per_page), 1)
+            rows = self._slice(number)
+        return self._build_page(rows, number)
+
+    def _slice(self, number):
+        bottom = (number - 1) * self.per_page
+        return list(self.object_list[bottom:bottom + self.per_page + 1])
+
+    def _seek(self, values, forward):
+        lookup = 'lt' if forward == self.descending else 'gt'
+        first, second = self.fields
+        return (
+            Q(**{f'{first}__{lookup}': values[0]})
+            | Q(**{first: values[0], f'{second}__{lookup}': values[1]})
+        )
+
+    def _page_after(self, values, number):
+        rows = list(
+            self.object_list.filter(self._seek(values, forward=True))
+            [:self.per_page + 1]
+        )
+        return self._build_page(rows, number)
+
+    def _page_before(self, values, number):
+        rows = list(
+            self.object_list.filter(self._seek(values, forward=False))
+            .reverse()[:self.per_page + 1]
+        )
+        if len(rows) <= self.per_page:
+            # Дошли до начала ленты - отдаём полную первую страницу.
+            return self.page_by_number(1)
+        rows = rows[:self.per_page][::-1]
+        return self._build_page(rows, max(number, 2), has_next=True)
+
+    def _position(self, obj):
+        # Строки values() - словари, а не объекты.
+        if isinstance(obj, dict):
+            return tuple(obj[name] for name in self.fields)
+        return tuple(getattr(obj, name) for name in self.fields)
+
+    def _build_page(self, rows, number, has_next=None):
+        if has_next is None:
+            has_next = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+        self._number = number
+        self._length = len(rows)
+        self._has_next = has_next
+        page = self._get_page(rows, number, self)
+        page.next_cursor = (
+            encode_cursor(NEXT, number + 1, self._position(rows[-1]))
+            if has_next else None
+        )
+        page.previous_cursor = (
+            encode_cursor(PREVIOUS, number - 1, self._position(rows[0]))
+            if number > 1 and rows else None
+        )
+        page.window = range(max(number - self.window, 1), self.num_pages + 1)
+        return page
@@ -0,0 +1,228 @@
+"""Полнотекстовый поиск по постам и комментариям.
+
+Тексты лежат в FTS5-таблице posts_search, которую синхронизируют
+триггеры SQLite: у строки поста rowid = 2 * id, у строки комментария
+2 * id + 1, а колонка post_id указывает пост, к которому относится
+текст. Результаты поиска - посты, ранжированные по лучшему (bm25)
+совпадению среди самого поста и его комментариев.
+
+При пересоздании таблицы posts_post или posts_comment (так SQLite
+выполняет многие миграции) её триггеры пропадают, поэтому после
+каждого migrate restore() возвращает их и переиндексирует тексты.
+"""
+import re
+from contextlib import contextmanager
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+
+TABLE = 'posts_search'
+
+CREATE_TABLE = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(
+        body, post_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+"""
+
+TRIGGERS = {
+    'posts_post_search_insert': f"""
+        AFTER INSERT ON posts_post BEGIN
+            INSERT INTO {TABLE}(rowid, body, post_id)
+            VALUES (new.id * 2, new.text, new.id);
+        END
+    """,
+    'posts_post_search_update': f"""
+        AFTER UPDATE OF text ON posts_post BEGIN
+            UPDATE {TABLE} SET body = new.text WHERE rowid = new.id * 2;
+        END
+    """,
+    'posts_post_search_delete': f"""
+        AFTER DELETE ON posts_post BEGIN
+            DELETE FROM {TABLE} WHERE rowid = old.id * 2;
+        END
+    """,
+    'posts_comment_search_insert': f"""
+        AFTER INSERT ON posts_comment BEGIN
+            INSERT INTO {TABLE}(rowid, body, post_id)
+            VALUES (new.id * 2 + 1, new.text, new.post_id);
+        END
+    """,
+    'posts_comment_search_update': f"""
+        AFTER UPDATE OF text, post_id ON posts_comment BEGIN
+            UPDATE {TABLE} SET body = new.text, post_id = new.post_id
+            WHERE rowid = new.id * 2 + 1;
+        END
+    """,
+    'posts_comment_search_delete': f"""
+        AFTER DELETE ON posts_comment BEGIN
+            DELETE FROM {TABLE} WHERE rowid = old.id * 2 + 1;
+        END
+    """,
+}
+
+WORD_RE = re.compile(r'\w+')
+# Границы подсветки в snippet(): управляющие символы не встречаются
+# в тексте и переживают экранирование HTML.
+MARK_START, MARK_END = '\x02', '\x03'
+SNIPPET_TOKENS = 24
+
+
+def _existing_objects():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def install():
+    """Создаёт таблицу индекса и триггеры и индексирует все тексты."""
+    existing = _existing_objects()
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_TABLE)
+        for name, body in TRIGGERS.items():
+            if name not in existing:
+                cursor.execute(f'CREATE TRIGGER {name} {body}')
+    rebuild()
+
+
+def restore():
+    """Возвращает пропавшие триггеры и переиндексирует тексты.
+    Если индекса нет (миграция откачена), ничего не делает.
+    Возвращает True, если индекс пришлось восстанавливать."""
+    existing = _existing_objects()
+    if TABLE not in existing or existing.issuperset(TRIGGERS):
+        return False
+    install()
+    return True
+
+
+@contextmanager
+def paused():
+    """Снимает триггеры на время массовой загрузки; в конце возвращает
+    их и индексирует все тексты одним проходом."""
+    with connection.cursor() as cursor:
+        for name in TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+    try:
+        yield
+    finally:
+        install()
+
+
+def rebuild():
+    """Заново заполняет индекс текстами всех постов и комментариев."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        cursor.execute(
+            f'INSERT INTO {TABLE}(rowid, body, post_id) '
+            'SELECT id * 2, text, id FROM posts_post'
+        )
+        cursor.execute(
+            f'INSERT INTO {TABLE}(rowid, body, post_id) '
+            'SELECT id * 2 + 1, text, post_id FROM posts_comment'
+        )
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('optimize')")
+
+
+def match_query(text):
+    """Запрос FTS5 из пользовательского ввода.
+
+    Каждое слово берётся в кавычки, поэтому синтаксис FTS5 во вводе
+    не работает; последнее слово ищется ещё и как префикс.
+    Все слова должны встретиться в одном тексте.
+    """
+    words = [f'"{word}"' for word in WORD_RE.findall(text)]
+    if words:
+        words[-1] += '*'
+    return ' '.join(words)
+
+
+def matching_post_ids(text):
+    """Подзапрос с id постов, у которых совпал текст или комментарий."""
+    return RawSQL(
+        f'SELECT post_id FROM {TABLE} WHERE {TABLE} MATCH %s',
+        [match_query(text)],
+    )
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+class SearchResults:
+    """Ленивая выборка найденных постов для Paginator.
+
+    Срез выполняет запрос ранжирования только для своей страницы,
+    а найденным постам проставляет `search_snippet` - фрагмент
+    лучшего совпадения с подсветкой.
+    """
+
+    def __init__(self, text):
+        self.query = match_query(text)
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = 0
+            if self.query:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'SELECT COUNT(DISTINCT post_id) FROM {TABLE} '
+                        f'WHERE {TABLE} MATCH %s AND post_id IS NOT NULL',
+                        [self.query],
+                    )
+                    self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            raise TypeError('SearchResults поддерживает только срезы.')
+        start = key.start or 0
+        stop = self.count() if key.stop is None else key.stop
+        if not self.query or stop <= start:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT post_id FROM {TABLE} '
+                f'WHERE {TABLE} MATCH %s AND post_id IS NOT NULL '
+                'GROUP BY post_id ORDER BY MIN(rank), post_id '
+                'LIMIT %s OFFSET %s',
+                [self.query, stop - start, start],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                return []
+            # Вспомогательные функции FTS5 не работают вместе с
+            # группировкой, поэтому фрагменты - отдельным запросом.
+            cursor.execute(
+                f'SELECT post_id, snippet({TABLE}, 0, %s, %s, %s, %s) '
+                f'FROM {TABLE} WHERE {TABLE} MATCH %s '
+                f'AND post_id IN ({", ".join(["%s"] * len(ids))}) '
+                'ORDER BY rank',
+                [MARK_START, MARK_END, '…', SNIPPET_TOKENS, self.query,
+                 *ids],
+            )
+            snippets = {}
+            for post_id, snippet in cursor.fetchall():
+                snippets.setdefault(post_id, snippet)
+        posts = Post.objects.select_related('author', 'group').in_bulk(ids)
+        results = []
+        for post_id in ids:
+            post = posts.get(post_id)
+            if post is not None:
+                post.search_snippet = highlight(snippets.get(post_id, ''))
+                results.append(post)
+        return results
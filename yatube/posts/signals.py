@@ -0,0 +1,189 @@
+import threading
+
+from django.db.models.signals import (
+    post_delete, post_migrate, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import caching, counters, search, thumbnails, timeline
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+# Посты, которые удаляются вместе с комментариями: id -> сколько их
+# комментариев ещё ждут post_delete. Счётчик и кеш таких постов
+# комментариям по одному трогать незачем. Все pre_delete каскада
+# приходят раньше всех post_delete, поэтому счёт точный.
+_deleting = threading.local()
+
+
+def _deleting_posts():
+    if not hasattr(_deleting, 'posts'):
+        _deleting.posts = {}
+    return _deleting.posts
+
+
+@receiver(post_save, sender=User)
+def user_create_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=User)
+def user_invalidate(sender, instance, created, raw=False, **kwargs):
+    # Шапка и другие персональные фрагменты (posts.holes) показывают
+    # имя пользователя.
+    if not created and not raw:
+        caching.bump(f'user:{instance.pk}')
+
+
+@receiver(pre_save, sender=Post)
+def post_remember_previous(sender, instance, raw=False, **kwargs):
+    if instance._state.adding or raw:
+        return
+    previous = Post.objects.filter(pk=instance.pk).values(
+        'group_id', 'image'
+    ).first() or {}
+    instance._previous_group_id = previous.get('group_id')
+    instance._previous_image = previous.get('image')
+
+
+@receiver(post_save, sender=Post)
+def post_fan_out(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Post)
+def post_enqueue_thumbnails(sender, instance, created, raw=False, **kwargs):
+    if raw or not instance.image:
+        return
+    if created or instance.image.name != instance._previous_image:
+        thumbnails.enqueue(instance)
+
+
+@receiver(post_save, sender=Post)
+def post_count_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_user(instance.author_id, 'post_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def post_count_deleted(sender, instance, **kwargs):
+    counters.change_user(instance.author_id, 'post_count', -1)
+
+
+@receiver(pre_delete, sender=Post)
+def post_mark_deleting(sender, instance, **kwargs):
+    _deleting_posts()[instance.pk] = 0
+
+
+@receiver(post_delete, sender=Post)
+def post_unmark_deleting(sender, instance, **kwargs):
+    posts = _deleting_posts()
+    if posts.get(instance.pk) == 0:
+        del posts[instance.pk]
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_invalidate(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_group_id', None)
+    caching.bump(*caching.post_scopes(instance, [previous]))
+
+
+@receiver(post_save, sender=Comment)
+def comment_count_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and instance.post_id is not None:
+        counters.change_post(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_count_deleted(sender, instance, **kwargs):
+    if (
+        instance.post_id is not None
+        and instance.post_id not in _deleting_posts()
+    ):
+        counters.change_post(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_invalidate(sender, instance, raw=False, **kwargs):
+    if (
+        raw or instance.post_id is None
+        or instance.post_id in _deleting_posts()
+    ):
+        return
+    post = Post.objects.select_related('author').filter(
+        pk=instance.post_id
+    ).first()
+    if post is not None:
+        caching.bump(*caching.post_scopes(post))
+
+
+@receiver(pre_delete, sender=Comment)
+def comment_mark_deleting(sender, instance, **kwargs):
+    posts = _deleting_posts()
+    if instance.post_id in posts:
+        posts[instance.post_id] += 1
+
+
+@receiver(post_delete, sender=Comment)
+def comment_unmark_deleting(sender, instance, **kwargs):
+    # Подключён после остальных post_delete комментария.
+    posts = _deleting_posts()
+    if instance.post_id in posts:
+        posts[instance.post_id] -= 1
+        if not posts[instance.post_id]:
+            del posts[instance.post_id]
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_invalidate(sender, instance, raw=False, **kwargs):
+    if not raw:
+        caching.bump('index', f'group:{instance.slug}')
+
+
+@receiver(post_save, sender=Follow)
+def follow_backfill(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.backfill(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_drop(sender, instance, **kwargs):
+    timeline.drop(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_count_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_user(instance.author_id, 'follower_count', 1)
+        counters.change_user(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_count_deleted(sender, instance, **kwargs):
+    counters.change_user(instance.author_id, 'follower_count', -1)
+    counters.change_user(instance.user_id, 'following_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_invalidate(sender, instance, raw=False, **kwargs):
+    if not raw:
+        caching.bump(
+            f'follow:{instance.user_id}',
+            f'user:{instance.user_id}',
+            f'profile:{instance.author.username}',
+        )
+
+
+@receiver(post_migrate)
+def search_restore_triggers(sender, **kwargs):
+    # SQLite пересоздаёт таблицу при многих изменениях схемы и
+    # теряет её триггеры; возвращаем их после каждого migrate.
+    if sender.name == 'posts':
+        search.restore()
@@ -0,0 +1,12 @@
+from django import template
+
+from posts import holes
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, name, **kwargs):
+    """Персональный фрагмент `name` (см. posts.holes): метка на общей
+    странице или готовый HTML на обычной."""
+    return holes.punch(context['request'], name, kwargs)
@@ -0,0 +1,18 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def ready_thumbnail(post, name='card'):
+    """Готовая миниатюра картинки поста или None, пока воркер её
+    не создал."""
+    return thumbnails.ready_thumbnail(post, name)
+
+
+@register.simple_tag
+def responsive_thumbnail(post, name='card'):
+    """Готовая миниатюра поста вместе с srcset её вариантов."""
+    return thumbnails.responsive_thumbnail(post, name)
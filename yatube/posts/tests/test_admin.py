@@ -0,0 +1,102 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..admin_tools import EstimatedCountPaginator
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class ScalableAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.authors = [
+            User.objects.create_user(username=f'author{i}') for i in range(5)
+        ]
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание ' * 30
+        )
+        for i in range(30):
+            Post.objects.create(
+                author=cls.authors[i % 5],
+                group=cls.group,
+                text=f'{i} ' + 'длинный текст ' * 50,
+            )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def test_changelist_does_not_list_users_or_count_table(self):
+        url = reverse('admin:posts_post_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        sql = '\n'.join(query['sql'] for query in queries)
+        self.assertNotIn('FROM "auth_user" ORDER BY', sql)
+        self.assertNotIn('SELECT COUNT(*) AS "__count" FROM "posts_post"\n',
+                         sql + '\n')
+        # Текст выбирается только обрезанным.
+        self.assertIsNone(re.search(
+            r'(?<!SUBSTR\()(?<!LENGTH\()"posts_post"\."text"', sql
+        ))
+        self.assertContains(response, '…')
+        self.assertLessEqual(len(queries), 8)
+
+    def test_autocomplete_filter(self):
+        author = self.authors[0]
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'),
+            {'author__id__exact': author.pk},
+        )
+        posts = list(response.context['cl'].result_list)
+        self.assertEqual(len(posts), 6)
+        self.assertTrue(all(post.author == author for post in posts))
+        self.assertContains(response, 'data-ajax--url')
+
+    def test_editable_group_keeps_autocomplete_without_row_queries(self):
+        other = Group.objects.create(
+            title='Другая', slug='other', description='Описание'
+        )
+        Post.objects.filter(pk=Post.objects.first().pk).update(group=other)
+        url = reverse('admin:posts_post_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        group_queries = [
+            query['sql'] for query in queries
+            if 'FROM "posts_group"' in query['sql']
+        ]
+        self.assertEqual(len(group_queries), 1)
+        self.assertIn('IN (', group_queries[0])
+        rows = re.findall(
+            r'<select name="form-\d+-group"[^>]*data-ajax--url',
+            response.content.decode(),
+        )
+        self.assertEqual(len(rows), 30)
+        self.assertContains(
+            response,
+            f'<option value="{other.pk}" selected>Другая</option>',
+            count=1, html=True,
+        )
+
+    def test_group_changelist(self):
+        response = self.client.get(reverse('admin:posts_group_changelist'))
+        self.assertContains(response, '…')
+
+    def test_paginator_caps_filtered_count(self):
+        paginator = EstimatedCountPaginator(
+            Post.objects.filter(group=self.group), 10
+        )
+        paginator.count_limit = 20
+        self.assertEqual(paginator.count, 21)
+        self.assertEqual(
+            EstimatedCountPaginator(Post.objects.all(), 10).count, 30
+        )
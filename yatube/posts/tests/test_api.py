@@ -0,0 +1,103 @@
+from django.conf import settings
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class FeedApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='-'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(settings.POSTS_QUANTITY + 3):
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.author, group=cls.group
+            )
+        cls.post = Post.objects.first()
+        Comment.objects.create(post=cls.post, author=cls.reader, text='-')
+
+    def test_feeds_are_paginated_by_cursor(self):
+        self.client.force_login(self.reader)
+        urls = [
+            reverse('api:index'),
+            reverse('api:group_list', kwargs={'slug': self.group.slug}),
+            reverse('api:profile', kwargs={'username': 'author'}),
+            reverse('api:follow_index'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                data = self.client.get(url).json()
+                self.assertEqual(
+                    len(data['results']), settings.POSTS_QUANTITY
+                )
+                self.assertEqual(data['results'][0], {
+                    'id': self.post.pk,
+                    'text': self.post.text,
+                    'pub_date': data['results'][0]['pub_date'],
+                    'author': 'author',
+                    'group': 'group',
+                    'image': None,
+                    'comment_count': 1,
+                })
+                data = self.client.get(data['next']).json()
+                self.assertEqual(len(data['results']), 3)
+                self.assertIsNone(data['next'])
+
+    def test_post_detail_has_comments(self):
+        data = self.client.get(
+            reverse('api:post_detail', kwargs={'post_id': self.post.pk})
+        ).json()
+        self.assertEqual(data['post']['id'], self.post.pk)
+        self.assertEqual(data['results'][0]['author'], 'reader')
+
+    def test_unchanged_feed_returns_not_modified(self):
+        url = reverse('api:index')
+        etag = self.client.get(url)['ETag']
+        self.assertFalse(etag.startswith('W/'))
+        # Только ключи страницы для ETag, без текстов и сериализации.
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(text='Новый пост', author=self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def edit_post(self):
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Исправленный пост'
+        post.save()
+
+    def test_edits_and_comments_change_etag(self):
+        self.client.force_login(self.reader)
+        urls = [
+            reverse('api:index'),
+            reverse('api:group_list', kwargs={'slug': self.group.slug}),
+            reverse('api:profile', kwargs={'username': 'author'}),
+            reverse('api:follow_index'),
+            reverse('api:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+        changes = [
+            self.edit_post,
+            lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Ещё'
+            ),
+        ]
+        for change in changes:
+            etags = {url: self.client.get(url)['ETag'] for url in urls}
+            change()
+            for url, etag in etags.items():
+                with self.subTest(url=url):
+                    response = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    )
+                    self.assertEqual(response.status_code, 200)
+
+    def test_follow_feed_requires_login(self):
+        response = self.client.get(reverse('api:follow_index'))
+        self.assertEqual(response.status_code, 401)
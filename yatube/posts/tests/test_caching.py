@@ -0,0 +1,108 @@
+import time
+import warnings
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import CacheKeyWarning, cache
+from django.db import DatabaseError, connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from .. import caching
+from ..models import Group, Post, User
+
+
+class CacheFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+        self.fail = False
+
+        @caching.cache_feed('group:{slug}')
+        def view(request, slug):
+            self.calls += 1
+            if self.fail:
+                raise DatabaseError('БД недоступна')
+            return HttpResponse(f'версия {self.calls}')
+
+        self.view = view
+
+    def get(self):
+        request = RequestFactory().get('/group/cats/')
+        request.user = AnonymousUser()
+        return self.view(request, slug='cats').content.decode()
+
+    def lock_key(self):
+        request = RequestFactory().get('/group/cats/')
+        request.user = AnonymousUser()
+        key, _ = caching.page_keys(request, ['group:cats'])
+        return f'{key}:lock'
+
+    def test_stale_copy_served_while_another_request_regenerates(self):
+        self.assertEqual(self.get(), 'версия 1')
+        caching.bump('group:cats')
+        cache.add(self.lock_key(), 1)
+        self.assertEqual(self.get(), 'версия 1')
+        self.assertEqual(self.calls, 1)
+        cache.delete(self.lock_key())
+        self.assertEqual(self.get(), 'версия 2')
+        self.assertEqual(self.get(), 'версия 2')
+
+    def test_stale_copy_served_when_database_fails(self):
+        self.get()
+        caching.bump('all')
+        self.fail = True
+        self.assertEqual(self.get(), 'версия 1')
+        # Неудачный пересчёт не оставляет блокировку.
+        self.assertIsNone(cache.get(self.lock_key()))
+        cache.clear()
+        with self.assertRaises(DatabaseError):
+            self.get()
+
+    def test_early_expiry_recomputes_before_deadline(self):
+        entry = {'version': 'v', 'expires': time.time() + 1, 'delta': 0}
+        self.assertTrue(caching._is_fresh(entry, 'v'))
+        self.assertFalse(caching._is_fresh(entry, 'other'))
+        # Страница, которая считалась дольше оставшегося срока,
+        # почти всегда пересчитывается заранее.
+        entry['delta'] = 10 ** 9
+        self.assertFalse(caching._is_fresh(entry, 'v'))
+
+    def test_scope_keys_are_valid_for_any_backend(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', CacheKeyWarning)
+            caching.bump('group:Тестовый слаг')
+            caching.generations(['profile:Имя Фамилия'])
+
+
+def refuse_queries(execute, sql, params, many, context):
+    raise DatabaseError('БД недоступна')
+
+
+class StaleIfErrorViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author')
+        group = Group.objects.create(
+            title='Группа', slug='group', description='-'
+        )
+        Post.objects.create(text='Пост в группе', author=author, group=group)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_pages_with_conditional_get_serve_stale_copy(self):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'group'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+        ]
+        for url in urls:
+            self.client.get(url)
+        caching.bump('all')
+        for url in urls:
+            with self.subTest(url=url):
+                with self.assertLogs('posts.caching', 'WARNING'):
+                    with connection.execute_wrapper(refuse_queries):
+                        response = self.client.get(url)
+                self.assertContains(response, 'Пост в группе')
@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from ..models import Comment, Group, Post, User
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='-'
+        )
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group
+        )
+        cls.comment = Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def revalidate(self, url, response):
+        return self.client.get(
+            url,
+            HTTP_IF_NONE_MATCH=response['ETag'],
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+
+    def test_unchanged_pages_return_not_modified(self):
+        urls = [
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn('no-cache', response['Cache-Control'])
+                # Только проверка состояния, без выборки ленты и шаблона.
+                with self.assertNumQueries(1):
+                    self.assertEqual(
+                        self.revalidate(url, response).status_code, 304
+                    )
+
+    def test_edits_change_validators(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        response = self.client.get(url)
+        self.comment.text = 'Исправленный комментарий'
+        self.comment.save()
+        changed = self.revalidate(url, response)
+        self.assertEqual(changed.status_code, 200)
+        self.assertContains(changed, 'Исправленный комментарий')
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        self.assertEqual(self.revalidate(url, changed).status_code, 200)
+
+    def test_validators_depend_on_user(self):
+        url = reverse('posts:profile', kwargs={'username': 'author'})
+        response = self.client.get(url)
+        self.client.force_login(self.reader)
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+    def test_validators_depend_on_csrf_cookie(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.client.force_login(self.reader)
+        response = self.client.get(url)
+        self.assertEqual(self.revalidate(url, response).status_code, 304)
+        # После нового входа у формы комментария другой токен.
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = get_random_string(64)
+        changed = self.revalidate(url, response)
+        self.assertEqual(changed.status_code, 200)
+        self.assertContains(changed, 'csrfmiddlewaretoken')
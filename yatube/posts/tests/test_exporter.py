@@ -0,0 +1,90 @@
+import json
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.moderator = User.objects.create_user(
+            username='moderator', is_staff=True
+        )
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='-'
+        )
+        start = timezone.now() - timedelta(days=10)
+        for i in range(5):
+            post = Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}',
+                image=f'posts/{i}.jpg' if i % 2 else '',
+            )
+            # Одинаковые даты у пар постов проверяют порядок по id.
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=start + timedelta(days=i // 2)
+            )
+        cls.url = reverse(
+            'posts:profile_export', kwargs={'username': cls.author.username}
+        )
+
+    def get(self, user, url=None, **params):
+        client = Client()
+        client.force_login(user)
+        return client.get(url or self.url, params)
+
+    def read_jsonl(self, response):
+        self.assertTrue(response.streaming)
+        body = b''.join(response.streaming_content).decode()
+        return [json.loads(line) for line in body.splitlines()]
+
+    def test_profile_export_streams_jsonl_in_order(self):
+        records = self.read_jsonl(self.get(self.author))
+        self.assertEqual(
+            [r['text'] for r in records], [f'Пост {i}' for i in range(5)]
+        )
+        self.assertNotIn('image', records[0])
+
+    def test_export_resumes_after_position(self):
+        records = self.read_jsonl(self.get(self.author))
+        third = records[2]
+        rest = self.read_jsonl(self.get(
+            self.author, after=f'{third["pub_date"]},{third["id"]}'
+        ))
+        self.assertEqual(rest, records[3:])
+        response = self.get(self.author, after='вчера')
+        self.assertEqual(response.status_code, 400)
+
+    def test_csv_with_images(self):
+        response = self.get(self.moderator, format='csv', images=1)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'type,id,author,group,pub_date,text,image')
+        self.assertTrue(lines[2].endswith(',posts/1.jpg'))
+
+    def test_export_permissions(self):
+        self.assertEqual(self.get(self.other).status_code, 403)
+        group_url = reverse(
+            'posts:group_export', kwargs={'slug': self.group.slug}
+        )
+        self.assertEqual(self.get(self.author, group_url).status_code, 403)
+        self.assertEqual(
+            len(self.read_jsonl(self.get(self.moderator, group_url))), 5
+        )
+
+    def test_export_command(self):
+        out = StringIO()
+        call_command('export_posts', '--group', self.group.slug, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[0])['group'], self.group.slug)
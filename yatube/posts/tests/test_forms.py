@@ -1,9 +1,13 @@
+from io import BytesIO
+
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
+from posts.forms import PostForm
 from posts.models import Group, Post
 
 User = get_user_model()
@@ -77,7 +81,7 @@ class PostFormsTest(TestCase):
         self.assertEqual(created_post.text, form_data['text'])
         self.assertEqual(created_post.author, self.post.author)
         self.assertEqual(created_post.group, self.group)
-        self.assertEqual(created_post.image, self.post.image)
+        self.assertTrue(created_post.image.name.startswith('posts/small'))
 
     def test_edit_post_in_db(self):#!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
         posts_count = Post.objects.count()
@@ -125,3 +129,40 @@ class PostFormsTest(TestCase):
             + '?next=' + reverse('posts:post_create')
         )
         self.assertEqual(Post.objects.count(), post_count)
+
+
+class PostImageUploadTest(TestCase):
+    @staticmethod
+    def jpeg(size, **save_options):
+        buffer = BytesIO()
+        Image.new('RGB', size, (200, 10, 10)).save(
+            buffer, 'JPEG', **save_options
+        )
+        return SimpleUploadedFile(
+            'photo.jpg', buffer.getvalue(), content_type='image/jpeg'
+        )
+
+    def clean_image(self, upload):
+        form = PostForm(data={'text': 'Фото'}, files={'image': upload})
+        form.is_valid()
+        return form
+
+    @override_settings(POST_IMAGE_MAX_SIDE=100)
+    def test_master_copy_is_downscaled_without_exif(self):
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        form = self.clean_image(self.jpeg((400, 200), exif=exif.tobytes()))
+        self.assertTrue(form.is_valid(), form.errors)
+        with Image.open(form.cleaned_data['image']) as master:
+            self.assertEqual(master.size, (100, 50))
+            self.assertNotIn('exif', master.info)
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100)
+    def test_too_many_pixels_rejected(self):
+        form = self.clean_image(self.jpeg((20, 20)))
+        self.assertIn('image', form.errors)
+
+    @override_settings(POST_IMAGE_MAX_BYTES=10)
+    def test_too_large_file_rejected(self):
+        form = self.clean_image(self.jpeg((20, 20)))
+        self.assertIn('image', form.errors)
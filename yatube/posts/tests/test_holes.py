@@ -0,0 +1,48 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Follow, Post, User
+
+
+class HolePunchingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feed_copy_is_shared_and_header_is_personal(self):
+        anonymous = self.client.get(reverse('posts:index')).content.decode()
+        self.assertIn('Войти', anonymous)
+        # Без сигналов поколение не меняется: новый текст появится,
+        # только если страница пересчитана.
+        Post.objects.filter(pk=self.post.pk).update(text='Изменённый')
+        self.client.force_login(self.reader)
+        content = self.client.get(reverse('posts:index')).content.decode()
+        self.assertIn('Пост', content)
+        self.assertNotIn('Изменённый', content)
+        self.assertNotIn('Войти', content)
+        self.assertIn('Пользователь:', content)
+        self.assertIn('Избранные авторы', content)
+        self.assertNotIn('<!--hole:', content)
+
+    def test_follow_button_follows_subscription(self):
+        url = reverse('posts:profile', kwargs={'username': 'author'})
+        self.client.force_login(self.reader)
+        self.assertContains(self.client.get(url), 'Подписаться')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertContains(self.client.get(url), 'Отписаться')
+        self.client.logout()
+        self.assertContains(self.client.get(url), 'Подписаться')
+
+    def test_fragments_render_inline_on_uncached_pages(self):
+        self.client.force_login(self.reader)
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        self.assertContains(response, 'Пользователь:')
+        self.assertNotContains(response, '<!--hole:')
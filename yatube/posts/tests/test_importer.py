@@ -0,0 +1,131 @@
+import json
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from .. import importer, search
+from ..models import Comment, Follow, Group, Post, TimelineEntry, User
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+RECORDS = [
+    {'type': 'user', 'username': 'leo', 'first_name': 'Лев'},
+    {'type': 'user', 'username': 'anna'},
+    {'type': 'group', 'slug': 'prose', 'title': 'Проза'},
+    {'type': 'post', 'id': 'p1', 'author': 'leo', 'group': 'prose',
+     'text': 'Все счастливые семьи похожи друг на друга',
+     'pub_date': '1877-01-01T10:00:00'},
+    {'type': 'post', 'id': 'p2', 'author': 'leo', 'text': 'Война и мир',
+     'pub_date': '1869-01-01T10:00:00+03:00'},
+    {'type': 'post', 'id': 'p3', 'author': 'ghost', 'text': 'Без автора'},
+    {'type': 'comment', 'post': 'p1', 'author': 'anna', 'text': 'Согласна'},
+    {'type': 'comment', 'post': 'p1', 'author': 'leo', 'text': 'Спасибо'},
+    {'type': 'follow', 'user': 'anna', 'author': 'leo'},
+    {'type': 'follow', 'user': 'anna', 'author': 'leo'},
+]
+
+
+class ImportContentTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def write(self, name, content):
+        path = f'{TEMP_DIR}/{name}'
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def import_jsonl(self, records, batch_size=3, **options):
+        path = self.write(
+            'data.jsonl',
+            '\n'.join(json.dumps(r, ensure_ascii=False) for r in records),
+        )
+        call_command('import_content', path, batch_size=batch_size,
+                     stdout=StringIO(), **options)
+
+    def test_import_creates_objects_and_derived_data(self):
+        self.import_jsonl(RECORDS)
+        leo = User.objects.get(username='leo')
+        anna = User.objects.get(username='anna')
+        self.assertEqual(leo.posts.count(), 2)
+        self.assertFalse(Post.objects.filter(text='Без автора').exists())
+        post = Post.objects.get(text__startswith='Все счастливые')
+        self.assertEqual(post.group, Group.objects.get(slug='prose'))
+        self.assertEqual(post.pub_date.year, 1877)
+        self.assertEqual(post.comment_count, 2)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(leo.stats.post_count, 2)
+        self.assertEqual(leo.stats.follower_count, 1)
+        self.assertEqual(anna.stats.following_count, 1)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=anna).count(), 2
+        )
+        self.assertEqual(
+            list(search.SearchResults('согласна')[0:10]), [post]
+        )
+
+    def test_reimport_skips_existing_users_and_groups(self):
+        self.import_jsonl(RECORDS)
+        self.import_jsonl(RECORDS[:3])
+        self.assertEqual(User.objects.filter(username='leo').count(), 1)
+        self.assertEqual(Group.objects.count(), 1)
+
+    def test_rows_inserted_during_import_do_not_clash(self):
+        def records():
+            yield from RECORDS[:6]
+            # Пока идёт импорт, сайт публикует пост.
+            Post.objects.create(
+                author=User.objects.get(username='leo'), text='С сайта'
+            )
+            yield {'type': 'post', 'author': 'anna', 'text': 'Ответ'}
+            yield from RECORDS[6:]
+
+        stats = importer.run(records(), batch_size=3)
+        self.assertEqual(stats['post'], 3)
+        self.assertEqual(stats['comment'], 2)
+        self.assertTrue(Post.objects.filter(text='Ответ').exists())
+        self.assertTrue(Post.objects.filter(text='С сайта').exists())
+
+    def test_failed_batch_keeps_derived_data_of_committed_ones(self):
+        bad = {'type': 'post', 'author': 'leo', 'pub_date': 'вчера'}
+        with self.assertRaises(importer.ImportRecordError):
+            importer.run(iter(RECORDS[:9] + [bad]), batch_size=3)
+        anna = User.objects.get(username='anna')
+        self.assertEqual(anna.stats.following_count, 1)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=anna).count(), 2
+        )
+        self.assertFalse(Post.objects.filter(text='').exists())
+
+    def test_search_triggers_survive_import(self):
+        self.import_jsonl(RECORDS, pause_search=True)
+        post = Post.objects.create(
+            author=User.objects.get(username='leo'), text='Воскресение'
+        )
+        self.assertEqual(
+            list(search.SearchResults('воскресение')[0:10]), [post]
+        )
+
+    def test_csv_import(self):
+        path = self.write(
+            'data.csv',
+            'type,username,slug,title,id,author,group,text,post\n'
+            'user,ivan,,,,,,,\n'
+            'group,,poems,Стихи,,,,,\n'
+            'post,,,,1,ivan,poems,Стихотворение,\n'
+            'comment,,,,,ivan,,Отзыв,1\n',
+        )
+        call_command('import_content', path, stdout=StringIO())
+        post = Post.objects.get(text='Стихотворение')
+        self.assertEqual(post.group.slug, 'poems')
+        self.assertEqual(Comment.objects.get().post, post)
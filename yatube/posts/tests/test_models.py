@@ -1,8 +1,13 @@
+from io import StringIO
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
-from ..models import Group, Post
+from ..models import Comment, Follow, Group, Post, UserStats
 
 User = get_user_model()
 
@@ -30,3 +35,62 @@ class PostModelTest(TestCase):
         expected_odjact_post = test_post.text[:settings.TEXT_LIMIT]
         self.assertEqual(expected_odjact_group, str(test_group))
         self.assertEqual(expected_odjact_post, str(test_post))
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_counters_follow_signals(self):
+        """Счётчики меняются при создании и удалении объектов."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        comment = Comment.objects.create(
+            post=post, author=self.user, text='Коммент'
+        )
+        self.assertEqual(self.stats(self.author).post_count, 1)
+        self.assertEqual(self.stats(self.author).follower_count, 1)
+        self.assertEqual(self.stats(self.user).following_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        comment.delete()
+        follow.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 0)
+        self.assertEqual(self.stats(self.author).follower_count, 0)
+        self.assertEqual(self.stats(self.user).following_count, 0)
+        post.delete()
+        self.assertEqual(self.stats(self.author).post_count, 0)
+
+    def test_post_deletion_cost_does_not_grow_with_comments(self):
+        def queries_to_delete(comments):
+            post = Post.objects.create(author=self.author, text='Пост')
+            Comment.objects.bulk_create(
+                Comment(post=post, author=self.user, text='Коммент')
+                for _ in range(comments)
+            )
+            with CaptureQueriesContext(connection) as queries:
+                post.delete()
+            return len(queries)
+
+        self.assertEqual(queries_to_delete(5), queries_to_delete(1))
+
+    def test_reconcile_fixes_drift(self):
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Импорт {i}') for i in range(3)
+        )
+        post = Post.objects.first()
+        Comment.objects.bulk_create(
+            Comment(post=post, author=self.user, text='Импорт')
+            for _ in range(2)
+        )
+        call_command('reconcile_counters', batch_size=1, stdout=StringIO())
+        self.assertEqual(self.stats(self.author).post_count, 3)
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 2)
@@ -0,0 +1,76 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post
+from ..paginators import CursorPaginator, decode_cursor
+
+User = get_user_model()
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='cursor')
+        Post.objects.bulk_create(
+            Post(text=f'Test post -{i}', author=cls.user) for i in range(25)
+        )
+        cls.ordered = list(Post.objects.order_by('-pub_date', '-pk'))
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_cursor_walk_matches_offset_order(self):
+        """Проход по курсорам выдаёт ту же ленту, что и OFFSET."""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        page = paginator.get_page()
+        seen = list(page)
+        while page.has_next():
+            paginator = CursorPaginator(Post.objects.all(), 10)
+            page = paginator.get_page(cursor=page.next_cursor)
+            seen.extend(page)
+        self.assertEqual(seen, self.ordered)
+        self.assertEqual(page.number, 3)
+
+    def test_previous_cursor_returns_previous_page(self):
+        first = CursorPaginator(Post.objects.all(), 10).get_page()
+        second = CursorPaginator(Post.objects.all(), 10).get_page(
+            cursor=first.next_cursor)
+        third = CursorPaginator(Post.objects.all(), 10).get_page(
+            cursor=second.next_cursor)
+        back = CursorPaginator(Post.objects.all(), 10).get_page(
+            cursor=third.previous_cursor)
+        self.assertEqual(list(back), list(second))
+        self.assertEqual(back.number, 2)
+        self.assertTrue(back.has_next())
+
+    def test_cursor_page_does_not_count(self):
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        first = paginator.get_page()
+        with self.assertNumQueries(1):
+            CursorPaginator(Post.objects.all(), 10).get_page(
+                cursor=first.next_cursor)
+
+    def test_broken_cursor_falls_back_to_first_page(self):
+        self.assertIsNone(decode_cursor('not-a-cursor'))
+        page = CursorPaginator(Post.objects.all(), 10).get_page(
+            cursor='not-a-cursor')
+        self.assertEqual(page.number, 1)
+
+    def test_page_number_compatibility(self):
+        response = self.client.get(reverse('posts:index') + '?page=3')
+        self.assertEqual(
+            list(response.context['page_obj']),
+            self.ordered[2 * settings.POSTS_QUANTITY:]
+        )
+        response = self.client.get(reverse('posts:index') + '?page=99')
+        self.assertEqual(response.context['page_obj'].number, 3)
+
+    def test_template_links_use_cursor(self):
+        response = self.client.get(reverse('posts:index'))
+        page = response.context['page_obj']
+        self.assertContains(response, f'?cursor={page.next_cursor}')
@@ -0,0 +1,114 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import urls
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Максимум SQL-запросов на одну страницу при холодном кеше.
+# Бюджет не должен зависеть от числа постов и комментариев.
+QUERY_BUDGETS = {
+    'index': 3,
+    'group_list': 5,
+    'profile': 6,
+    'post_detail': 5,
+    'post_edit': 5,
+    'post_create': 3,
+    'add_comment': 3,
+    'post_comments': 3,
+    'follow_index': 3,
+    'profile_follow': 15,
+    'profile_unfollow': 9,
+    'post_search': 6,
+    'profile_export': 3,
+    'group_export': 2,
+}
+# Строки запроса для страниц, которым без параметров нечего делать.
+QUERY_STRINGS = {
+    'post_search': '?q=Пост',
+}
+
+
+class QueryBudgetTests(TestCase):
+    """Число запросов каждой страницы укладывается в бюджет."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.users = [
+            User.objects.create_user(
+                username=f'user{i}', first_name='Имя', last_name=f'{i}'
+            )
+            for i in range(8)
+        ]
+        cls.reader, cls.author = cls.users[:2]
+        cls.groups = [
+            Group.objects.create(
+                title=f'Группа {i}', slug=f'group{i}', description='-'
+            )
+            for i in range(3)
+        ]
+        for user in cls.users[2:]:
+            Follow.objects.create(user=cls.author, author=user)
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {i}',
+                author=cls.users[1 + i % 7],
+                group=cls.groups[i % 3] if i % 4 else None,
+            )
+            for i in range(60)
+        ]
+        cls.post = next(
+            post for post in cls.posts if post.author == cls.author
+        )
+        Comment.objects.bulk_create(
+            Comment(
+                post=cls.post, author=cls.users[i % 8], text=f'Коммент {i}'
+            )
+            for i in range(40)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def url_kwargs(self):
+        return {
+            'index': {},
+            'group_list': {'slug': self.groups[0].slug},
+            'profile': {'username': self.author.username},
+            'post_detail': {'post_id': self.post.pk},
+            'post_edit': {'post_id': self.post.pk},
+            'post_create': {},
+            'add_comment': {'post_id': self.post.pk},
+            'post_comments': {'post_id': self.post.pk},
+            'follow_index': {},
+            'profile_follow': {'username': self.reader.username},
+            'profile_unfollow': {'username': self.reader.username},
+            'post_search': {},
+            'profile_export': {'username': self.author.username},
+            'group_export': {'slug': self.groups[0].slug},
+        }
+
+    def test_every_url_has_budget(self):
+        names = {pattern.name for pattern in urls.urlpatterns}
+        self.assertEqual(names, set(QUERY_BUDGETS))
+
+    def test_pages_fit_query_budget(self):
+        for name, kwargs in self.url_kwargs().items():
+            with self.subTest(name=name):
+                cache.clear()
+                url = reverse(f'posts:{name}', kwargs=kwargs)
+                url += QUERY_STRINGS.get(name, '')
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get(url)
+                self.assertLessEqual(
+                    len(queries), QUERY_BUDGETS[name],
+                    '\n'.join(query['sql'] for query in queries),
+                )
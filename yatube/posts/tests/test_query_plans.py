@@ -0,0 +1,76 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Полный проход по таблице или сортировка во временном B-дереве
+# означают, что запрос ленты перестал попадать в индекс.
+BAD_PLAN = re.compile(
+    r'^SCAN (TABLE )?posts_\w+( AS \w+)?$|USE TEMP B-TREE'
+)
+
+
+class QueryPlanTests(TestCase):
+    """Основные запросы страниц читают данные по индексам."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='-'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(25):
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.author, group=cls.group
+            )
+        cls.post = Post.objects.first()
+        Comment.objects.create(post=cls.post, author=cls.reader, text='-')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def plans(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        with connection.cursor() as cursor:
+            for query in queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT') or 'posts_' not in sql:
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                yield sql, [row[-1] for row in cursor.fetchall()]
+
+    def test_feed_queries_use_indexes(self):
+        first_page = self.client.get(reverse('posts:index'))
+        cursor = first_page.context['page_obj'].next_cursor
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:index') + f'?cursor={cursor}',
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:follow_index'),
+            reverse('api:index'),
+            reverse('api:group_list', kwargs={'slug': self.group.slug}),
+            reverse('api:profile', kwargs={'username': self.author.username}),
+            reverse('api:follow_index'),
+        ]
+        for url in urls:
+            for sql, plan in self.plans(url):
+                with self.subTest(url=url, sql=sql):
+                    bad = [step for step in plan if BAD_PLAN.search(step)]
+                    self.assertEqual(bad, [], plan)
@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import search
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.cats = Post.objects.create(
+            author=cls.author, text='Котики спят на <b>подоконнике</b>'
+        )
+        cls.dogs = Post.objects.create(
+            author=cls.author, text='Собаки гуляют во дворе'
+        )
+        Comment.objects.create(
+            post=cls.dogs, author=cls.author, text='А котики смотрят'
+        )
+
+    def search(self, text):
+        response = Client().get(reverse('posts:post_search'), {'q': text})
+        return response, list(response.context['page_obj'])
+
+    def test_finds_posts_by_text_and_comments(self):
+        _, posts = self.search('котики')
+        self.assertEqual(set(posts), {self.cats, self.dogs})
+        _, posts = self.search('гуляют')
+        self.assertEqual(posts, [self.dogs])
+
+    def test_snippet_is_escaped_and_highlighted(self):
+        response, _ = self.search('подоконн')
+        self.assertContains(response, '<mark>подоконнике</mark>')
+        self.assertContains(response, '&lt;b&gt;')
+
+    def test_index_follows_edits_and_deletes(self):
+        self.cats.text = 'Попугаи'
+        self.cats.save()
+        self.assertEqual(self.search('котики')[1], [self.dogs])
+        self.dogs.comments.all().delete()
+        self.assertEqual(self.search('котики')[1], [])
+        self.assertEqual(self.search('попугаи')[1], [self.cats])
+
+    def test_query_syntax_is_not_interpreted(self):
+        response, posts = self.search('котики" OR NEAR(')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(posts, [])
+
+    def test_restore_brings_back_lost_triggers(self):
+        from django.db import connection
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER posts_post_search_insert')
+        self.assertTrue(search.restore())
+        post = Post.objects.create(author=self.author, text='Хомяки')
+        self.assertEqual(self.search('хомяки')[1], [post])
+        self.assertFalse(search.restore())
+
+    def test_admin_changelist_uses_index(self):
+        client = Client()
+        client.force_login(self.admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'гуляют'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.dogs]
+        )
@@ -0,0 +1,136 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import caching, thumbnails
+from ..models import Post, ThumbnailJob
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPipelineTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='photographer')
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+
+    def test_saving_post_enqueues_job(self):
+        self.assertTrue(ThumbnailJob.objects.filter(post=self.post).exists())
+
+    def test_feed_shows_placeholder_until_worker_runs(self):
+        response = Client().get(reverse('posts:index'))
+        self.assertNotContains(response, '<img class="card-img')
+        self.assertContains(response, 'bg-light')
+
+        self.assertEqual(thumbnails.process_queue(), 1)
+        self.assertFalse(ThumbnailJob.objects.exists())
+
+        response = Client().get(reverse('posts:index'))
+        im = thumbnails.ready_thumbnail(self.post, 'card')
+        self.assertIsNotNone(im)
+        self.assertContains(response, f'src="{im.url}"')
+
+    def test_failed_generation_keeps_job_for_retry(self):
+        default_storage.delete(self.post.image.name)
+        generation = caching.generations(['index'])
+        with self.assertLogs('posts.thumbnails', 'ERROR'):
+            self.assertEqual(thumbnails.process_queue(), 1)
+        job = ThumbnailJob.objects.get(post=self.post)
+        self.assertEqual(job.attempts, 1)
+        # Ни одной миниатюры: страницы перерисовывать незачем.
+        self.assertEqual(caching.generations(['index']), generation)
+        # Пока аренда не кончилась, задание никто не берёт.
+        self.assertEqual(thumbnails.process_queue(), 0)
+        ThumbnailJob.objects.update(locked_until=timezone.now())
+        with self.assertLogs('posts.thumbnails', 'ERROR'):
+            self.assertEqual(thumbnails.process_queue(), 1)
+        self.assertEqual(ThumbnailJob.objects.get().attempts, 2)
+
+    def test_page_thumbnails_are_fetched_in_one_query(self):
+        posts = [self.post] + [
+            Post.objects.create(
+                author=self.user,
+                text=f'Ещё пост {i}',
+                image=SimpleUploadedFile(
+                    f'small{i}.gif', SMALL_GIF, 'image/gif'
+                ),
+            )
+            for i in range(3)
+        ]
+        thumbnails.process_queue()
+        cache.clear()
+        posts = list(Post.objects.filter(pk__in=[p.pk for p in posts]))
+        with self.assertNumQueries(1):
+            thumbnails.prefetch_thumbnails(posts)
+        with self.assertNumQueries(0):
+            for post in posts:
+                self.assertIsNotNone(
+                    thumbnails.ready_thumbnail(post, 'card')
+                )
+
+    def test_pages_without_images_skip_thumbnail_lookup(self):
+        thumbnails.process_queue()
+        url = reverse('posts:profile', kwargs={'username': 'photographer'})
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            Client().get(url)
+        self.assertFalse([
+            query for query in queries
+            if 'thumbnail_kvstore' in query['sql']
+        ])
+
+    def test_feed_serves_width_variants(self):
+        thumbnails.process_queue()
+        response = Client().get(reverse('posts:index'))
+        card = thumbnails.responsive_thumbnail(self.post, 'card')
+        widths = settings.POST_IMAGE_VARIANT_WIDTHS['card']
+        self.assertEqual(len(card['srcset'].split(', ')), len(widths))
+        self.assertContains(response, f'srcset="{card["srcset"]}"')
+        self.assertContains(response, f'type="{card["type"]}"')
+        self.assertContains(response, 'width="960" height="339"')
+        self.assertContains(response, 'loading="lazy"')
+
+        response = Client().get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        self.assertContains(response, 'loading="eager"')
+
+    def test_check_reports_missing_sorl_internals(self):
+        self.assertEqual(thumbnails.check_sorl_internals(), [])
+        internals = (*thumbnails.SORL_INTERNALS, (Post, ('_no_such',)))
+        with mock.patch.object(thumbnails, 'SORL_INTERNALS', internals):
+            errors = thumbnails.check_sorl_internals()
+        self.assertEqual([error.id for error in errors], ['posts.E001'])
+        self.assertIn('Post._no_such', errors[0].msg)
@@ -0,0 +1,94 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def feed(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        Post.objects.create(text='Чужой пост', author=self.other)
+        self.assertEqual(self.feed(), [post])
+
+    def test_follow_backfills_and_unfollow_drops(self):
+        post = Post.objects.create(text='Старый пост', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.feed(), [post])
+        Follow.objects.filter(user=self.reader, author=self.author).delete()
+        self.assertEqual(self.feed(), [])
+
+    @override_settings(TIMELINE_LENGTH=3)
+    def test_timeline_is_capped(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+            for i in range(5)
+        ]
+        entries = TimelineEntry.objects.filter(user=self.reader)
+        self.assertEqual(entries.count(), 3)
+        self.assertEqual(
+            set(entries.values_list('post_id', flat=True)),
+            {post.pk for post in posts[2:]},
+        )
+        self.reader.stats.refresh_from_db()
+        self.assertEqual(self.reader.stats.timeline_count, 3)
+        # Полная лента теряет по одной самой старой записи без
+        # пересчёта всей ленты.
+        with CaptureQueriesContext(connection) as queries:
+            post = Post.objects.create(text='Ещё', author=self.author)
+        self.assertNotIn('ROW_NUMBER', ' '.join(q['sql'] for q in queries))
+        self.assertEqual(
+            set(entries.values_list('post_id', flat=True)),
+            {posts[3].pk, posts[4].pk, post.pk},
+        )
+        Follow.objects.filter(user=self.reader).delete()
+        self.reader.stats.refresh_from_db()
+        self.assertEqual(self.reader.stats.timeline_count, 0)
+
+    def test_fan_out_cost_does_not_grow_with_followers(self):
+        def queries_for_post():
+            with CaptureQueriesContext(connection) as queries:
+                Post.objects.create(text='Пост', author=self.author)
+            return len(queries)
+
+        Follow.objects.create(user=self.reader, author=self.author)
+        few = queries_for_post()
+        for number in range(5):
+            Follow.objects.create(
+                user=User.objects.create_user(username=f'fan{number}'),
+                author=self.author,
+            )
+        self.assertEqual(queries_for_post(), few)
+
+    def test_rebuild_command_restores_timeline(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.bulk_create(
+            Post(text=f'Импорт {i}', author=self.author) for i in range(3)
+        )
+        self.assertEqual(self.feed(), [])
+        call_command('rebuild_timelines', 'reader', stdout=StringIO())
+        self.assertEqual(len(self.feed()), 3)
@@ -191,13 +191,36 @@ class PostVievTest(TestCase):#!!!!!!!!!!!!!!!!!!!!!!!
 
     def test_cash_index_page(self):
         response_0 = self.authorized_client.get('/', follow=True)
-        Post.objects.all().delete()
+        # update() не шлёт сигналов - страница остаётся в кеше
+        Post.objects.update(text='Изменён в обход сигналов')
         response_1 = self.authorized_client.get('/', follow=True)
         self.assertEqual(response_0.content, response_1.content)
         cache.clear()
         response_2 = self.authorized_client.get('/', follow=True)
         self.assertNotEqual(response_0.content, response_2.content)
 
+    def test_cache_invalidated_by_signals(self):
+        """Сохранение и удаление поста сразу сбрасывает кеш лент."""
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.user.username}),
+        )
+        for page in pages:
+            with self.subTest(page=page):
+                self.authorized_client.get(page)
+                new_post = Post.objects.create(
+                    author=self.user,
+                    text='Свежий пост',
+                    group=self.group,
+                )
+                response = self.authorized_client.get(page)
+                self.assertContains(response, 'Свежий пост')
+                new_post.delete()
+                response = self.authorized_client.get(page)
+                self.assertNotContains(response, 'Свежий пост')
+
 class PostPaginationTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -309,3 +332,23 @@ class PostCommentsTest(TestCase):
         self.assertEqual(Comment.objects.count(), comments_count+1)
         self.assertTrue(Comment.objects.filter(
             text = form_data['text']).exists())
+
+    def test_comments_are_paginated_by_cursor(self):
+        total = settings.COMMENTS_PER_PAGE + 5
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.user, text=f'Коммент {i}')
+            for i in range(total)
+        )
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}))
+        first_page = list(response.context['comments'])
+        self.assertEqual(len(first_page), settings.COMMENTS_PER_PAGE)
+        self.assertEqual(first_page[0].text, 'Коммент 0')
+        next_url = response.context['next_comments_url']
+        self.assertContains(response, next_url)
+        response = self.guest_client.get(next_url)
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            [f'Коммент {i}' for i in range(settings.COMMENTS_PER_PAGE, total)],
+        )
+        self.assertIsNone(response.context['next_comments_url'])
@@ -0,0 +1,298 @@
+"""Заблаговременная генерация миниатюр картинок постов.
+
+Шаблоны не ресайзят картинки в запросе: они только ищут готовую
+миниатюру в key-value хранилище sorl и, пока её нет, показывают
+заглушку. Миниатюры всех геометрий из settings.THUMBNAIL_GEOMETRIES
+и их адаптивные варианты по ширине (`<имя>-<ширина>`, для srcset)
+создаёт воркер очереди ThumbnailJob (`manage.py thumbnail_worker`)
+или массово `manage.py generate_thumbnails`.
+
+Имя готовой миниатюры без её генерации sorl наружу не отдаёт, поэтому
+LookupBackend и _read_many опираются на его внутренние методы
+(SORL_INTERNALS). Они проверены с версией из requirements.txt, а
+проверка posts.E001 (check_sorl_internals) сообщит, если обновление
+sorl их уберёт.
+"""
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import checks
+from django.db import close_old_connections, connections
+from django.db.models import F, Q
+from django.utils import timezone
+from PIL import features
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import KVStoreBase, add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core import timing
+
+from . import caching
+from .models import Post, ThumbnailJob
+
+logger = logging.getLogger(__name__)
+
+MIME_TYPES = {'WEBP': 'image/webp', 'JPEG': 'image/jpeg', 'PNG': 'image/png'}
+# Внутренние части sorl, без которых не найти готовую миниатюру.
+SORL_INTERNALS = (
+    (ThumbnailBackend, (
+        '_get_format', '_get_thumbnail_filename', 'default_options',
+        'extra_options',
+    )),
+    (KVStoreBase, ('_get_raw',)),
+    (cached_db_kvstore, ('EMPTY_VALUE',)),
+)
+
+
+def check_sorl_internals(app_configs=None, **kwargs):
+    missing = [
+        f'{owner.__name__}.{name}'
+        for owner, names in SORL_INTERNALS
+        for name in names
+        if not hasattr(owner, name)
+    ]
+    if not missing:
+        return []
+    return [checks.Error(
+        'В установленной версии sorl-thumbnail нет '
+        + ', '.join(missing) + '.',
+        hint='Поставьте версию sorl-thumbnail из requirements.txt.',
+        id='posts.E001',
+    )]
+
+
+class LookupBackend(ThumbnailBackend):
+    """Бэкенд sorl, который только ищет готовые миниатюры."""
+
+    def thumbnail_file(self, file_, geometry_string, **options):
+        """Файл миниатюры с тем же именем, что даст get_thumbnail."""
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def lookup(self, file_, geometry_string, **options):
+        return default.kvstore.get(
+            self.thumbnail_file(file_, geometry_string, **options)
+        )
+
+
+backend = LookupBackend()
+
+
+def variant_format():
+    """Формат адаптивных вариантов; если Pillow собран без WebP,
+    варианты делаются в JPEG."""
+    image_format = settings.POST_IMAGE_VARIANT_FORMAT
+    if image_format == 'WEBP' and not features.check('webp'):
+        return 'JPEG'
+    return image_format
+
+
+def geometries():
+    """Все геометрии миниатюр: имя -> (геометрия, опции sorl)."""
+    result = dict(settings.THUMBNAIL_GEOMETRIES)
+    variant_options = {'format': variant_format()}
+    for name, widths in settings.POST_IMAGE_VARIANT_WIDTHS.items():
+        geometry, options = settings.THUMBNAIL_GEOMETRIES[name]
+        width, height = map(int, geometry.split('x'))
+        for variant_width in widths:
+            variant_height = round(height * variant_width / width)
+            result[f'{name}-{variant_width}'] = (
+                f'{variant_width}x{variant_height}',
+                {**options, **variant_options},
+            )
+    return result
+
+
+def ready_thumbnail(post, name):
+    """Готовая миниатюра геометрии `name` или None, если её ещё нет.
+    Для постов после prefetch_thumbnails обходится без хранилища."""
+    if hasattr(post, 'thumbnails'):
+        return post.thumbnails.get(name)
+    if not post.image:
+        return None
+    geometry, options = geometries()[name]
+    with timing.span('thumbnail'):
+        return backend.lookup(post.image, geometry, **options)
+
+
+def responsive_thumbnail(post, name):
+    """Готовая миниатюра и srcset из её готовых вариантов.
+
+    Возвращает словарь с ключами `image` (JPEG-запас или None),
+    `srcset`, `type` (MIME вариантов) и `sizes`.
+    """
+    srcset = []
+    for width in settings.POST_IMAGE_VARIANT_WIDTHS.get(name, ()):
+        variant = ready_thumbnail(post, f'{name}-{width}')
+        if variant is not None:
+            srcset.append(f'{variant.url} {variant.width}w')
+    return {
+        'image': ready_thumbnail(post, name),
+        'srcset': ', '.join(srcset),
+        'type': MIME_TYPES[variant_format()],
+        'sizes': settings.POST_IMAGE_SIZES,
+    }
+
+
+def _read_many(keys):
+    """Сырые значения key-value хранилища sorl для набора ключей:
+    один get_many к кешу и один запрос к БД для промахов."""
+    kvstore = default.kvstore
+    if not isinstance(kvstore, cached_db_kvstore.KVStore):
+        return {key: kvstore._get_raw(key) for key in keys}
+    found = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        rows = dict(
+            KVStoreModel.objects.filter(key__in=missing)
+            .values_list('key', 'value')
+        )
+        # Отсутствие тоже кешируем, как это делает сам sorl.
+        fetched = {
+            key: rows.get(key, cached_db_kvstore.EMPTY_VALUE)
+            for key in missing
+        }
+        kvstore.cache.set_many(fetched, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        found.update(fetched)
+    return {
+        key: value for key, value in found.items()
+        if value is not None and value != cached_db_kvstore.EMPTY_VALUE
+    }
+
+
+def prefetch_thumbnails(posts):
+    """Находит готовые миниатюры всех постов страницы разом и
+    кладёт их в `post.thumbnails` (имя геометрии -> файл или None)."""
+    wanted = {}
+    all_geometries = geometries()
+    for post in posts:
+        post.thumbnails = {}
+        if not post.image:
+            continue
+        for name, (geometry, options) in all_geometries.items():
+            thumbnail = backend.thumbnail_file(
+                post.image, geometry, **options
+            )
+            # Разные имена могут давать один файл (вариант во всю
+            # ширину в формате запаса), поэтому ключ -> список.
+            wanted.setdefault(add_prefix(thumbnail.key), []).append(
+                (post, name)
+            )
+            post.thumbnails[name] = None
+    with timing.span('thumbnail'):
+        found = _read_many(list(wanted))
+    for key, value in found.items():
+        image = deserialize_image_file(value)
+        for post, name in wanted[key]:
+            post.thumbnails[name] = image
+    return posts
+
+
+def generate(image_name):
+    """Создаёт миниатюры всех геометрий; возвращает их число."""
+    created = 0
+    for geometry, options in geometries().values():
+        try:
+            with timing.span('thumbnail'):
+                get_thumbnail(image_name, geometry, **options)
+        except Exception:
+            logger.exception('Не удалось создать миниатюру %s', image_name)
+            continue
+        # Нечитаемый исходник sorl только логирует и возвращает
+        # несозданный файл; удачей считается лишь запись в хранилище.
+        if backend.lookup(image_name, geometry, **options) is None:
+            logger.error('Не удалось создать миниатюру %s', image_name)
+        else:
+            created += 1
+    return created
+
+
+def enqueue(post):
+    # Новая картинка - новое задание: аренда и попытки сбрасываются,
+    # и воркер, занятый прежней картинкой, задание не удалит.
+    ThumbnailJob.objects.update_or_create(
+        post=post, defaults={'locked_until': None, 'attempts': 0}
+    )
+
+
+def claim(job):
+    """Берёт задание в аренду; None, если его уже взял другой воркер.
+    Срок аренды служит и меткой владельца."""
+    now = timezone.now()
+    lease = now + timedelta(seconds=settings.THUMBNAIL_JOB_LEASE)
+    claimed = ThumbnailJob.objects.filter(pk=job.pk).filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lt=now)
+    ).update(locked_until=lease, attempts=F('attempts') + 1)
+    return lease if claimed else None
+
+
+def process_queue(batch_size=20):
+    """Разбирает пачку заданий очереди; возвращает число
+    взятых заданий."""
+    done = 0
+    now = timezone.now()
+    jobs = ThumbnailJob.objects.filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lt=now),
+        attempts__lt=settings.THUMBNAIL_JOB_MAX_ATTEMPTS,
+    ).select_related('post__author').order_by('created')[:batch_size]
+    for job in jobs:
+        lease = claim(job)
+        if lease is None:
+            continue
+        done += 1
+        created = generate(job.post.image.name) if job.post.image else 0
+        if created:
+            # Страницы с заглушкой вместо картинки пора перерисовать.
+            caching.bump(*caching.post_scopes(job.post))
+        if job.post.image and created < len(geometries()):
+            # Остальное доделает следующая попытка после конца аренды.
+            if job.attempts + 1 >= settings.THUMBNAIL_JOB_MAX_ATTEMPTS:
+                logger.error(
+                    'Миниатюры поста %s не созданы за %s попыток',
+                    job.post_id, job.attempts + 1,
+                )
+            continue
+        ThumbnailJob.objects.filter(pk=job.pk, locked_until=lease).delete()
+    return done
+
+
+def _generate_chunk(image_names):
+    close_old_connections()
+    return sum(generate(name) for name in image_names)
+
+
+def generate_all(processes=None, chunk_size=50):
+    """Создаёт миниатюры для всех постов с картинками в пуле процессов."""
+    names = Post.objects.exclude(image='').order_by('pk').values_list(
+        'image', flat=True
+    )
+    chunks, chunk = [], []
+    for name in names.iterator():
+        chunk.append(name)
+        if len(chunk) == chunk_size:
+            chunks.append(chunk)
+            chunk = []
+    if chunk:
+        chunks.append(chunk)
+    # Дочерние процессы не должны делить соединения с родителем.
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        created = sum(pool.map(_generate_chunk, chunks))
+    caching.bump('all')
+    return created
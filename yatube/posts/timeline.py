@@ -0,0 +1,151 @@
+"""Материализованная лента подписок (fan-out on write).
+
+Каждый новый пост раскладывается в ленты подписчиков автора,
+подписка досыпает в ленту последние посты автора, отписка
+убирает их. Лента каждого пользователя обрезается до
+settings.TIMELINE_LENGTH самых свежих записей; её длину хранит
+UserStats.timeline_count, поэтому новый пост не пересчитывает ленты
+подписчиков. Расхождения счётчика (каскадные удаления постов)
+исправляет reconcile_counters.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from . import caching, counters
+from .models import Follow, Post, TimelineEntry, UserStats
+
+
+def _trim_oldest(users):
+    """Убирает по самой старой записи из лент читателей users
+    (queryset из одной колонки с их id), переросших TIMELINE_LENGTH.
+
+    Кто перерос предел, видно по UserStats.timeline_count, а самая
+    старая запись находится по индексу (user, -pub_date, -post) с
+    другого конца, так что цена не зависит от длины лент.
+    """
+    over = UserStats.objects.filter(
+        user_id__in=users, timeline_count__gt=settings.TIMELINE_LENGTH
+    )
+    oldest = TimelineEntry.objects.filter(
+        user_id=OuterRef('user_id')
+    ).order_by('pub_date', 'post_id').values('pk')[:1]
+    TimelineEntry.objects.filter(
+        pk__in=over.annotate(oldest=Subquery(oldest)).values('oldest')
+    ).delete()
+    over.update(timeline_count=F('timeline_count') - 1)
+
+
+def _trim_user(user_id):
+    """Обрезает ленту одного читателя и записывает её точную длину."""
+    entries = TimelineEntry.objects.filter(user_id=user_id)
+    entries.filter(pk__in=entries.order_by(
+        '-pub_date', '-post_id'
+    ).values('pk')[settings.TIMELINE_LENGTH:]).delete()
+    total = entries.order_by().values('user_id').annotate(
+        total=Count('pk')
+    ).values('total')
+    UserStats.objects.filter(user_id=user_id).update(
+        timeline_count=Coalesce(
+            Subquery(total, output_field=IntegerField()), 0
+        )
+    )
+
+
+def fan_out(post):
+    """Кладёт новый пост в ленты всех подписчиков автора."""
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values('user_id')
+    follower_ids = list(
+        followers.values_list('user_id', flat=True).distinct()
+    )
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                user_id=user_id,
+                post=post,
+                author_id=post.author_id,
+                pub_date=post.pub_date,
+            )
+            for user_id in follower_ids
+        ],
+        ignore_conflicts=True,
+    )
+    # Новый пост свежее всех записей лент: каждая выросла на одну
+    # запись и теряет не больше одной.
+    UserStats.objects.filter(user_id__in=followers).update(
+        timeline_count=F('timeline_count') + 1
+    )
+    _trim_oldest(followers)
+
+
+def backfill(follow):
+    """Досыпает в ленту подписчика последние посты автора."""
+    posts = (
+        Post.objects.filter(author_id=follow.author_id)
+        .order_by('-pub_date', '-pk')
+        .values_list('pk', 'pub_date')[:settings.TIMELINE_LENGTH]
+    )
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                user_id=follow.user_id,
+                post_id=post_id,
+                author_id=follow.author_id,
+                pub_date=pub_date,
+            )
+            for post_id, pub_date in posts
+        ],
+        ignore_conflicts=True,
+    )
+    _trim_user(follow.user_id)
+
+
+def drop(follow):
+    """Убирает из ленты посты автора, от которого отписались."""
+    deleted, _ = TimelineEntry.objects.filter(
+        user_id=follow.user_id,
+        author_id=follow.author_id,
+    ).delete()
+    if deleted:
+        counters.change_user(follow.user_id, 'timeline_count', -deleted)
+
+
+def rebuild(user_ids, batch_size=1000):
+    """Пересобирает ленты пользователей с нуля; возвращает
+    число созданных записей."""
+    created = 0
+    for user_id in user_ids:
+        posts = (
+            Post.objects.filter(author__following__user_id=user_id)
+            .order_by('-pub_date', '-pk')
+            .values_list('pk', 'author_id', 'pub_date')
+            .distinct()[:settings.TIMELINE_LENGTH]
+        )
+        entries = [
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for post_id, author_id, pub_date in posts
+        ]
+        # Django 2.2 не урезает явный batch_size до лимитов SQLite
+        # на число переменных и составных SELECT в одном INSERT.
+        safe_batch_size = min(batch_size, connection.ops.bulk_batch_size(
+            TimelineEntry._meta.concrete_fields, entries
+        ))
+        with transaction.atomic():
+            TimelineEntry.objects.filter(user_id=user_id).delete()
+            TimelineEntry.objects.bulk_create(
+                entries, batch_size=safe_batch_size
+            )
+            UserStats.objects.filter(user_id=user_id).update(
+                timeline_count=len(entries)
+            )
+        caching.bump(f'follow:{user_id}')
+        created += len(entries)
+    return created
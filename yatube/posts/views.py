@@ -1,30 +1,59 @@
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
 from django.core.paginator import Paginator
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.urls import reverse
 
+from . import exporter, search, thumbnails
+from .caching import cache_feed
+from .conditional import (
+    conditional_page, group_state, post_detail_state, profile_state
+)
 from .forms import CommentForm, PostForm
-from .models import Group, Post, User, Follow
+from .holes import punch_holes
+from .models import (
+    Comment, Follow, Group, Post, TimelineEntry, User, UserStats
+)
+from .paginators import CursorPaginator
 
 
-def get_page_context(queryset, request):
-    paginator = Paginator(queryset, settings.POSTS_QUANTITY)
+def get_page_context(queryset, request, ordering=None, transform=None):
+    paginator = CursorPaginator(
+        queryset,
+        settings.POSTS_QUANTITY,
+        ordering=ordering,
+        window=settings.PAGINATOR_WINDOW,
+    )
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginator.get_page(
+        page_number,
+        cursor=request.GET.get('cursor'),
+    )
+    if transform is not None:
+        page_obj.object_list = transform(page_obj.object_list)
     return {
         'paginator': paginator,
         'page_number': page_number,
         'page_obj': page_obj,
     }
 
-@cache_page(20, key_prefix ='index_page')
+
+@punch_holes
+@cache_feed('index')
 def index(request):
     template = 'posts/index.html'
-    context = get_page_context(Post.objects.all(), request)
+    context = get_page_context(
+        Post.objects.select_related('author', 'group'), request
+    )
+    thumbnails.prefetch_thumbnails(context['page_obj'].object_list)
     return render(request, template, context)
 
 
+@conditional_page(group_state)
+@punch_holes
+@cache_feed('group:{slug}')
 def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
@@ -33,38 +62,81 @@ def group_posts(request, slug):
         'group': group,
         'posts': posts,
     }
-    context.update(get_page_context(group.posts.all(), request))
+    context.update(get_page_context(
+        group.posts.select_related('author', 'group'), request
+    ))
     return render(request, template, context)
 
 
+@conditional_page(profile_state)
+@punch_holes
+@cache_feed('profile:{username}')
 def profile(request, username):
     # Здесь код запроса к модели и создание словаря контекста
-    author = get_object_or_404(User, username=username)
-    following = author.following.filter(user_id =request.user.id)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    stats = getattr(author, 'stats', None) or UserStats(user=author)
     context = {
         'author': author,
-        'following': following,
+        'stats': stats,
+        'post_count': stats.post_count,
     }
-    context.update(get_page_context(author.posts.all(), request))
+    context.update(get_page_context(
+        author.posts.select_related('author', 'group'), request
+    ))
     return render(request, 'posts/profile.html', context)
 
 
+def get_comments_context(post_id, cursor=None):
+    """Страница комментариев поста по курсору на (created, id)
+    и адрес фрагмента со следующей страницей."""
+    paginator = CursorPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        settings.COMMENTS_PER_PAGE,
+        ordering=('created', 'pk'),
+    )
+    page_obj = paginator.get_page(cursor=cursor)
+    next_url = None
+    if page_obj.next_cursor:
+        next_url = '{}?cursor={}'.format(
+            reverse('posts:post_comments', kwargs={'post_id': post_id}),
+            page_obj.next_cursor,
+        )
+    return {'comments': page_obj.object_list, 'next_comments_url': next_url}
+
+
+@conditional_page(post_detail_state)
 def post_detail(request, post_id):
     """Posts_detail page method"""
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
+    thumbnails.prefetch_thumbnails([post])
     form = CommentForm(request.POST or None,)
     context = {
         'post': post,
         'form': form,
-        'comments': post.comments.all()
     }
+    # Сервер рисует только первую страницу, остальные догружает
+    # post_comments.
+    context.update(get_comments_context(post.pk))
     return render(request, 'posts/post_detail.html', context)
 
 
+def post_comments(request, post_id):
+    """Фрагмент со следующей страницей комментариев."""
+    return render(
+        request,
+        'posts/includes/comments.html',
+        get_comments_context(post_id, request.GET.get('cursor')),
+    )
+
+
 @login_required
 def post_create(request):
     """Создать новый пост"""
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
@@ -109,26 +181,78 @@ def add_comment(request, post_id):
         comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
+def export_response(request, queryset, filename):
+    """Потоковая выгрузка постов: ?format=jsonl|csv, ?after=<дата>,<id>
+    для продолжения с места обрыва и ?images=1 для путей картинок."""
+    data_format = request.GET.get('format', 'jsonl')
+    if data_format not in exporter.FORMATS:
+        return HttpResponseBadRequest('Формат: jsonl или csv.')
+    after = request.GET.get('after')
+    try:
+        after = exporter.parse_after(after) if after else None
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+    images = bool(request.GET.get('images'))
+    records = exporter.post_records(
+        queryset, after, images, chunk_size=settings.EXPORT_CHUNK_SIZE
+    )
+    response = StreamingHttpResponse(
+        exporter.render(records, data_format, images),
+        content_type=exporter.CONTENT_TYPES[data_format],
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{filename}.{data_format}"'
+    )
+    return response
+
+
+@login_required
+def profile_export(request, username):
+    """Выгрузка постов автора: самому автору и модераторам."""
+    author = get_object_or_404(User, username=username)
+    if request.user != author and not request.user.is_staff:
+        raise PermissionDenied
+    return export_response(request, author.posts.all(), f'posts-{username}')
+
+
+@login_required
+def group_export(request, slug):
+    """Выгрузка постов группы для модераторов."""
+    if not request.user.is_staff:
+        raise PermissionDenied
+    group = get_object_or_404(Group, slug=slug)
+    return export_response(request, group.posts.all(), f'group-{slug}')
+
+
+def post_search(request):
+    """Полнотекстовый поиск по постам и комментариям."""
+    query = request.GET.get('q', '').strip()
+    paginator = Paginator(
+        search.SearchResults(query), settings.POSTS_QUANTITY
+    )
+    context = {
+        'query': query,
+        'page_obj': paginator.get_page(request.GET.get('page')),
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
+@punch_holes
+@cache_feed('follow:{user}')
 def follow_index(request):
+    """Лента подписок читается из материализованной ленты пользователя."""
+    entries = TimelineEntry.objects.filter(
+        user=request.user
+    ).select_related('post__author', 'post__group')
     context = get_page_context(
-        Post.objects.filter(author__following__user=request.user),
-        request
-        )
+        entries,
+        request,
+        ordering=('-pub_date', '-post_id'),
+        transform=lambda page: [entry.post for entry in page],
+    )
+    thumbnails.prefetch_thumbnails(context['page_obj'].object_list)
     return render(request, 'posts/follow.html', context)
-    # template = 'posts/follow.html'
-    # author = get_object_or_404(Post, user=request.user)
-    # posts = Post.author.all()
-
-    # template = 'posts/group_list.html'
-    # group = get_object_or_404(Group, slug=slug)
-    # posts = group.posts.all()
-    # context = {
-    #     'author': author,
-    #     'posts': posts,
-    # }
-    # context.update(get_page_context(Post.author.all(), request))
-    # return render(request, template, context)
 
 
 # @login_required
@@ -0,0 +1,20 @@
+"""Настройки сервера, которого поднимает loadtest.
+
+БД и рабочие файлы берутся из временного каталога, путь к которому
+передаёт переменная окружения YATUBE_SCRATCH_DIR (core.scratch):
+синтетические пользователи, посты и комментарии остаются в копии БД,
+а кеш и метрики живого сервера нагрузка не трогает.
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import CACHES, DATABASES, LOGGING
+
+SCRATCH_DIR = os.environ['YATUBE_SCRATCH_DIR']
+
+DATABASES['default']['NAME'] = os.path.join(SCRATCH_DIR, 'db.sqlite3')
+METRICS_DB = os.path.join(SCRATCH_DIR, 'metrics.sqlite3')
+SLOW_QUERY_LOG_FILE = os.path.join(SCRATCH_DIR, 'slow_queries.log')
+LOGGING['handlers']['slow_queries']['filename'] = SLOW_QUERY_LOG_FILE
+for alias, options in CACHES.items():
+    options['LOCATION'] = os.path.join(SCRATCH_DIR, f'cache-{alias}.sqlite3')
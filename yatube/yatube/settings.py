@@ -14,6 +14,9 @@ import os
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Рабочие файлы процессов сервера (метрики, кеш); каталог создаётся
+# с правами только для владельца
+VAR_DIR = os.path.join(BASE_DIR, 'var')
 
 
 # Quick-start development settings - unsuitable for production
@@ -50,6 +53,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ServerTimingMiddleware',
+    'core.middleware.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -131,6 +136,10 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media') 
+# Загрузки всегда пишутся во временный файл на диске, а не в память
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
 
 STATIC_URL = '/static/'
 LOGIN_URL = 'users:login'
@@ -145,12 +154,106 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 # Константы
 TEXT_LIMIT = 15
 POSTS_QUANTITY = 10
+# Сколько комментариев показывать на странице поста и догружать за раз
+COMMENTS_PER_PAGE = 20
+# Сколько соседних номеров страниц показывать в паджинаторе
+PAGINATOR_WINDOW = 2
+# Сколько последних постов хранить в ленте подписок пользователя
+TIMELINE_LENGTH = 1000
+# Сколько хранить страницы лент; их сбрасывает смена поколения
+FEED_CACHE_TIMEOUT = 60 * 60
+# Сколько ещё держать устаревшую копию, пока её пересчитывает один
+# запрос или пока недоступна БД
+FEED_CACHE_STALE_TIMEOUT = 24 * 60 * 60
+# Сколько живёт блокировка пересчёта страницы и сколько её ждать
+FEED_CACHE_LOCK_TIMEOUT = 10
+# Насколько охотно страница пересчитывается до истечения (XFetch)
+FEED_CACHE_EARLY_BETA = 1.0
+# Сколько хранить персональные фрагменты общих страниц (posts.holes);
+# их сбрасывает смена поколения области пользователя
+FRAGMENT_CACHE_TIMEOUT = 60 * 60
+# Сколько строк выгрузки читать из БД за один раз
+EXPORT_CHUNK_SIZE = 2000
+# Ограничения картинок постов: размер файла, число пикселей в заголовке
+# и большая сторона сохраняемой мастер-копии
+POST_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 50_000_000
+POST_IMAGE_MAX_SIDE = 2048
+# Миниатюры картинок постов: имя -> (геометрия, опции sorl-thumbnail).
+# Их заранее создаёт воркер очереди, шаблоны берут только готовые.
+THUMBNAIL_GEOMETRIES = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+# Адаптивные варианты миниатюр для srcset: имя геометрии -> ширины.
+# Варианты сохраняются в POST_IMAGE_VARIANT_FORMAT, а сама геометрия
+# остаётся JPEG-запасом для браузеров без его поддержки.
+POST_IMAGE_VARIANT_WIDTHS = {
+    'card': (320, 640, 960),
+}
+POST_IMAGE_VARIANT_FORMAT = 'WEBP'
+# Очередь миниатюр: на сколько секунд воркер берёт задание и сколько
+# раз его пробовать, прежде чем оставить в очереди для разбора
+THUMBNAIL_JOB_LEASE = 5 * 60
+THUMBNAIL_JOB_MAX_ATTEMPTS = 5
+# Атрибут sizes для картинки карточки: ширина колонки ленты
+POST_IMAGE_SIZES = '(min-width: 992px) 960px, 100vw'
+
+# Замеры запросов (core.middleware.ServerTimingMiddleware): у какой
+# доли запросов отдавать замеры в заголовке и логе (метрики учитывают
+# все), отдавать ли заголовок Server-Timing всем (иначе только
+# сотрудникам) и с какой длительности запроса писать строку в лог
+# yatube.timing
+REQUEST_TIMING_SAMPLE_RATE = 1.0
+REQUEST_TIMING_HEADER = DEBUG
+REQUEST_TIMING_LOG_THRESHOLD_MS = 500
+# Счётчики и гистограммы запросов для /metrics/: общий для всех
+# процессов файл и как часто процесс дописывает в него свои замеры
+METRICS_ENABLED = True
+METRICS_DB = os.path.join(VAR_DIR, 'metrics.sqlite3')
+METRICS_FLUSH_INTERVAL = 5
+# Журнал медленных SQL-запросов (core.slow_queries): порог и файл,
+# сводка по нему - на странице /admin/slow-queries/
+SLOW_QUERY_THRESHOLD_MS = 100
+SLOW_QUERY_LOG_FILE = os.path.join(BASE_DIR, 'slow_queries.log')
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+        'slow_queries': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SLOW_QUERY_LOG_FILE,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'encoding': 'utf-8',
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'yatube.timing': {'handlers': ['console'], 'level': 'INFO'},
+        'yatube.slow_queries': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
 
 # Имя view-функции, обрабатывающей ошибку 403
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
-# Подключение кеширования 
+# Подключение кеширования: один файл SQLite на все процессы сервера
+# (core.sqlite_cache), предел - в байтах значений
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.sqlite_cache.SQLiteCache',
+        'LOCATION': os.path.join(VAR_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_SIZE': 256 * 1024 * 1024,
+            'CULL_FREQUENCY': 10,
+        },
     }
-} 
\ No newline at end of file
+}
+
+# Тесты работают с кешем, метриками и журналом медленных запросов во
+# временном каталоге (core.scratch); для pytest то же делает conftest.py
+TEST_RUNNER = 'core.scratch.TestRunner'